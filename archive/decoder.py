@@ -1,6 +1,10 @@
+import os
 import re
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from baud_estimate import estimate_bit_period
+
 # --- Configuration ---
 BAUD_RATE = 38400
 BIT_TIME = 1000000 / BAUD_RATE  # Bit time in microseconds
@@ -26,7 +30,7 @@ def parse_transitions(file_path):
         sys.exit(1)
     return transitions
 
-def decode_stream(transitions):
+def decode_stream(transitions, bit_time=BIT_TIME):
     """Decodes the stream of transitions into bytes, correcting for timing drift."""
     bytes_found = []
     
@@ -38,7 +42,7 @@ def decode_stream(transitions):
         total_duration = duration + remainder
         
         # Calculate how many bits this duration represents
-        num_bits = total_duration / BIT_TIME
+        num_bits = total_duration / bit_time
         
         # The number of bits to generate is the rounded integer part
         num_bits_to_generate = int(round(num_bits))
@@ -48,7 +52,7 @@ def decode_stream(transitions):
                 timeline.append(level)
         
         # The new remainder is the leftover time, carried to the next transition
-        remainder = total_duration - (num_bits_to_generate * BIT_TIME)
+        remainder = total_duration - (num_bits_to_generate * bit_time)
 
     i = 0
     # Find the first potential start bit (idle 1 -> active 0)
@@ -93,39 +97,26 @@ def decode_stream(transitions):
 
 
 def find_packets(byte_list, headers):
-    """Finds and returns a list of packets based on known headers."""
-    packets = []
+    """Finds and returns a list of packets based on known headers.
+
+    Each packet runs from its header to the next header, or to the end of the stream.
+    Headers are compared exactly and may have any length; one pass over the stream.
+    """
+    by_first = {}
+    for header in headers:
+        by_first.setdefault(header[0], []).append(tuple(header))
+
+    starts = []
     i = 0
     while i < len(byte_list):
-        found_header = False
-        for header in headers:
-            header_len = len(header)
-            if i + header_len <= len(byte_list) and tuple(byte_list[i:i+header_len]) == header:
-                # Found a header, now determine packet length.
-                # This is a placeholder: assuming a fixed length or a length byte.
-                # Let's look for the next header to determine length.
-                next_header_index = -1
-                for j in range(i + header_len, len(byte_list)):
-                    for h in headers:
-                        hl = len(h)
-                        if j + hl <= len(byte_list) and tuple(byte_list[j:j+hl]) == h:
-                            next_header_index = j
-                            break
-                    if next_header_index != -1:
-                        break
-                
-                if next_header_index != -1:
-                    packets.append(byte_list[i:next_header_index])
-                    i = next_header_index
-                else:
-                    # Last packet in the stream
-                    packets.append(byte_list[i:])
-                    i = len(byte_list)
-                found_header = True
+        for header in by_first.get(byte_list[i], ()):
+            if tuple(byte_list[i:i+len(header)]) == header:
+                starts.append(i)
+                i += len(header)
                 break
-        if not found_header:
+        else:
             i += 1
-    return packets
+    return [byte_list[start:end] for start, end in zip(starts, starts[1:] + [len(byte_list)])]
 
 def print_packets(packets):
     """Prints a list of packets, each on a new line."""
@@ -148,13 +139,15 @@ if __name__ == "__main__":
     else:
         file_path = 'data.txt'
 
-    print(f"Decoding {file_path} at {BAUD_RATE} baud...")
-    
     transitions = parse_transitions(file_path)
     if not transitions:
         print("No transitions found in file.")
     else:
-        decoded_bytes = decode_stream(transitions)
+        # Measure the bit period from the capture itself; BAUD_RATE if that fails or is implausible
+        estimate = estimate_bit_period(transitions, expected=BAUD_RATE)
+        bit_time = estimate.bit_us if estimate else BIT_TIME
+        print(f"Decoding {file_path} at {1000000 / bit_time:.0f} baud...")
+        decoded_bytes = decode_stream(transitions, bit_time)
         
         # Known headers
         headers = [
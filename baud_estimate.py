@@ -0,0 +1,139 @@
+from collections import namedtuple
+
+# Bit period estimation from the edges at the start of a burst.
+#
+# 1. Candidates: pulses at the active level (0 on an idle-high UART line) are the start
+#    bit plus any zero data bits after it, so always a whole number of bits, while high
+#    runs can include inter-byte idle of any length. The median of the shortest cluster of
+#    low pulses, divided by k = 1, 2, ..., gives the candidate periods that all low
+#    pulses are whole multiples of (a GCD by trial), each refined to sum(widths) /
+#    sum(bit counts).
+# 2. Frame check: from each start edge, every edge of the frame must fall on a whole bit
+#    and the line must stay high through the stop bits. This rejects a period that is a
+#    multiple of the real one (a burst of identical words with no single-bit pulse) as well
+#    as a fraction of it. The candidate with the fewest bad frames wins, the longer one on
+#    a tie.
+# 3. Refinement: least squares of edge offset against bit number within each frame. Frame
+#    spans are ~10 bits against ~2 for single pulses, so 1 us tick noise averages out to a
+#    few hundred ppm over a 128-edge sample.
+# 4. Plausibility: given the configured baud, an estimate more than MAX_PPM away from it is
+#    rejected. A UART frame can't be read past roughly that error anyway, so a period that far
+#    off is a misfit (noise, a short sample) and the configured one decodes better.
+
+ESTIMATE_EDGES = 128     # durations sampled from the start of the burst
+MIN_PULSES = 6           # fewer active-level pulses than this: no estimate
+MAX_RUN_BITS = 12        # longest active-level run of one frame, with margin
+CLUSTER_SPREAD = 1.5     # pulses up to this times the shortest one form the first cluster
+PULSE_TOLERANCE = 0.2    # mean distance of pulse width / period from a whole number of bits
+EDGE_TOLERANCE = 0.3     # largest distance of an edge from a bit boundary within a frame
+MAX_BAD_FRAMES = 0.1     # share of frames that may fail the frame check
+FRAME_BITS = 12          # start + 8 data + parity/address + 2 stop
+STOP_BITS = 2
+MAX_PPM = 50000          # largest accepted distance of an estimate from the expected baud (5%)
+STANDARD_BAUDS = (1200, 2400, 4800, 9600, 14400, 19200, 28800, 38400, 57600, 76800, 115200,
+                  230400, 250000, 460800, 500000, 921600, 1000000)
+
+# bit_us: measured bit period; baud: 1e6 / bit_us; nominal: nearest standard rate;
+# ppm: how far baud is from nominal (positive: the sender runs fast); frames: frames fitted
+BaudEstimate = namedtuple("BaudEstimate", "bit_us baud nominal ppm frames")
+
+
+def nearest_standard(baud):
+    return min(STANDARD_BAUDS, key=lambda b: abs(b / baud - 1))
+
+
+def fit_pulses(pulses, period):
+    """
+    (mean distance of the pulses from whole multiples of period, refined period);
+    (None, period) if a pulse is too long.
+    """
+    error = 0.0
+    total = bits = 0
+    for d in pulses:
+        n = round(d / period)
+        if n > MAX_RUN_BITS:
+            return None, period
+        error += abs(d / period - n)     # a glitch (n == 0) counts its full width
+        total += d * (n > 0)
+        bits += n
+    return error / len(pulses), (total / bits if bits else period)
+
+
+def fit_frames(times, levels, period, frame_bits=FRAME_BITS, stop_bits=STOP_BITS):
+    """
+    Walk the frames of an edge list at period. Returns (frames, bad frames, refined period).
+    times: edge times in us; levels: the level after each edge.
+    """
+    last_data = frame_bits - stop_bits      # bit number of the edge into the stop bits
+    frames = bad = 0
+    sum_tn = sum_nn = 0.0
+    i = 0
+    n_edges = len(times)
+    while i < n_edges:
+        if levels[i] != 0 or (i and levels[i - 1] == 0):
+            i += 1
+            continue
+        start = times[i]
+        # The next start bit can't come before the stop bits are over
+        end = start + (frame_bits - EDGE_TOLERANCE) * period
+        frames += 1
+        ok = True
+        j = i + 1
+        while j < n_edges and times[j] < end:
+            offset = times[j] - start
+            n = round(offset / period)
+            if n < 1 or n > last_data or abs(offset / period - n) > EDGE_TOLERANCE \
+                    or (n == last_data and levels[j] == 0):
+                ok = False
+            else:
+                sum_tn += offset * n
+                sum_nn += n * n
+            j += 1
+        bad += not ok
+        i = j
+    return frames, bad, (sum_tn / sum_nn if sum_nn else period)
+
+
+def estimate_bit_period(durations, max_edges=ESTIMATE_EDGES, active_level=0,
+                        frame_bits=FRAME_BITS, stop_bits=STOP_BITS, expected=None, max_ppm=MAX_PPM):
+    """
+    Estimate the bit period from the first max_edges (level, duration_us) pairs.
+    Returns a BaudEstimate, or None if the sample is too short, fits no period or, with
+    expected (a baud rate), lands more than max_ppm away from expected.
+    """
+    sample = durations[:max_edges]
+    pulses = sorted(d for level, d in sample if level == active_level and d > 0)
+    if len(pulses) < MIN_PULSES:
+        return None
+    # Skip the very shortest few: a glitch that got through is narrower than any bit
+    shortest = pulses[len(pulses) // 32]
+    cluster = [d for d in pulses if d <= shortest * CLUSTER_SPREAD]
+    base = cluster[len(cluster) // 2]
+
+    times = []
+    levels = []
+    t = 0
+    for level, d in sample:
+        times.append(t)
+        levels.append(level if active_level == 0 else 1 - level)
+        t += d
+
+    best = None
+    for k in range(1, MAX_RUN_BITS + 1):
+        error, period = fit_pulses(pulses, base / k)
+        if error is None:
+            break       # longer pulses no longer fit: smaller periods won't either
+        if error > PULSE_TOLERANCE:
+            continue
+        frames, bad, period = fit_frames(times, levels, period, frame_bits, stop_bits)
+        if frames and (best is None or bad < best[0]):
+            best = (bad, frames, period)
+    if best is None or best[0] > best[1] * MAX_BAD_FRAMES:
+        return None
+    # Second pass from the refined period: frames cut short by a wrong first guess rejoin
+    frames, bad, period = fit_frames(times, levels, best[2], frame_bits, stop_bits)
+    baud = 1000000.0 / period
+    if expected and abs(baud / expected - 1) * 1e6 > max_ppm:
+        return None
+    nominal = nearest_standard(baud)
+    return BaudEstimate(period, baud, nominal, (baud / nominal - 1) * 1e6, frames - bad)
@@ -0,0 +1,254 @@
+import argparse
+import contextlib
+import glob
+import importlib.util
+import io
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+from baud_estimate import estimate_bit_period
+from gpio_uart import GpioUart, GpioUartStream
+
+# Decode-throughput benchmark built from the checked-in packet_*_{rx,tx}.txt corpus.
+# The decoded words of every capture are re-encoded as 8E2 waveforms ((level, duration)
+# lists, like analyze_transitions returns) with optional edge jitter and baud error, then
+# each decoder is timed over the whole set. A regression gate checks that the main-path
+# decoders still reproduce the corpus words.
+#
+#   python bench_decode.py --jitter 1.0 --baud-error 0.005 --repeat 3
+#   python bench_decode.py --jitter 2.0 --tolerance      # max baud error per decoder
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RX_ROW = re.compile(r"^[0-9A-F]{4}:\s+((?:[0-9A-F]{3} )*[0-9A-F]{3})")
+TX_ROW = re.compile(r"^[0-9a-f]{8}  ((?:[0-9a-f]{2} )*[0-9a-f]{2})")
+
+
+def load_corpus(pattern="packet_*_*.txt"):
+    """[(name, words)] from the RX hexdumps (9-bit words) and TX hexdumps (mark parity: bit 8 set)."""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(HERE, pattern))):
+        words = []
+        with open(path) as f:
+            for line in f:
+                m = RX_ROW.match(line)
+                if m:
+                    words.extend(int(w, 16) for w in m.group(1).split())
+                    continue
+                m = TX_ROW.match(line)
+                if m:
+                    words.extend(int(b, 16) | 0x100 for b in m.group(1).split())
+        if words:
+            corpus.append((os.path.basename(path), words))
+    return corpus
+
+
+def encode_8e2(words, baud=38400, jitter_us=0.0, baud_error=0.0, idle_bits=(1, 3), rng=None):
+    """
+    Waveform for a burst of 9-bit words: start, 8 data bits LSB first, bit 8, 2 stop bits,
+    then a random idle of idle_bits. Edge times get +/- jitter_us of uniform noise and the
+    bit period is stretched by baud_error (0.01 = 1% slow). Returns [(level, duration_us)].
+    """
+    rng = rng or random.Random(0)
+    bit_us = 1000000.0 / baud * (1.0 + baud_error)
+    levels = []
+    for w in words:
+        levels.append(0)
+        levels.extend((w >> i) & 1 for i in range(9))
+        levels.extend([1] * (2 + rng.randint(*idle_bits)))
+    edges = []
+    prev = None
+    for i, level in enumerate(levels):
+        if level != prev:
+            edges.append((level, i * bit_us + (rng.uniform(-jitter_us, jitter_us) if edges else 0.0)))
+            prev = level
+    edges.append((prev, len(levels) * bit_us))
+    durations = []
+    for (level, t), (_, t_next) in zip(edges, edges[1:]):
+        durations.append((level, max(1, int(round(t_next)) - int(round(t)))))
+    return durations
+
+
+def load_archive_decoder():
+    spec = importlib.util.spec_from_file_location("archive_decoder", os.path.join(HERE, "archive", "decoder.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def timed(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def build_cases(corpus, jitter_us, baud_error, seed):
+    rng = random.Random(seed)
+    return [(name, words, encode_8e2(words, jitter_us=jitter_us, baud_error=baud_error, rng=rng)) for name, words in corpus]
+
+
+def run(corpus, jitter_us=0.0, baud_error=0.0, repeat=3, seed=1):
+    gpio_uart = GpioUart(None, data_pin=GpioUart.DATA_PIN)
+    cases = build_cases(corpus, jitter_us, baud_error, seed)
+    n_words = sum(len(words) for _, words, _ in cases)
+    n_edges = sum(len(durations) for _, _, durations in cases)
+    archive_decoder = load_archive_decoder()
+
+    # One long capture with >20-bit idles between packets, for the splitter
+    gap = (1, int(40 * 1000000 / 38400))
+    joined = []
+    for _, _, durations in cases:
+        joined.extend(durations)
+        joined.append(gap)
+
+    bits_cache = [gpio_uart.decode_edges(d) for _, _, d in cases]
+
+    benches = [
+        ("decode_bitstream", lambda: [gpio_uart.decode_bitstream(d) for _, _, d in cases]),
+        ("decode_edges", lambda: [gpio_uart.decode_edges(d) for _, _, d in cases]),
+        ("decode_pll", lambda: [gpio_uart.decode_pll(d) for _, _, d in cases]),
+        ("decode_fixed", lambda: [gpio_uart.decode_fixed(d) for _, _, d in cases]),
+        ("decode_uart", lambda: [gpio_uart.decode_uart(b, 8, 1, 2) for b in bits_cache]),
+        ("split_durations_by_long_idle", lambda: gpio_uart.split_durations_by_long_idle(joined, threshold_bits=20)),
+        ("estimate_bit_period", lambda: [estimate_bit_period(d) for _, _, d in cases]),
+        ("GpioUartStream", lambda: [stream_words(d) for _, _, d in cases]),
+        ("archive decode_stream", lambda: [archive_decoder.decode_stream(d) for _, _, d in cases]),
+    ]
+    try:
+        import numpy as np
+        import gpio_uart_np
+        arrays = [(np.array([l for l, _ in d], dtype=np.int8), np.array([u for _, u in d], dtype=np.int64)) for _, _, d in cases]
+        benches.append(("numpy decode_bitstream", lambda: [gpio_uart_np.decode_bitstream(l, u) for l, u in arrays]))
+    except ImportError:
+        pass
+
+    print(f"{len(cases)} captures, {n_words} words, {n_edges} edges (jitter +/-{jitter_us} us, baud error {baud_error:+.2%})")
+    print(f"{'decoder':<30} {'time ms':>10} {'bytes/s':>12} {'edges/s':>12} {'peak KiB':>10}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = []
+        for name, func in benches:
+            elapsed, _ = timed(func, repeat)
+            rows.append((name, elapsed, peak_memory(func)))
+    for name, elapsed, peak in rows:
+        print(f"{name:<30} {elapsed*1000:>10.2f} {n_words/elapsed:>12.0f} {n_edges/elapsed:>12.0f} {peak/1024:>10.1f}")
+    return cases
+
+
+def gate(corpus, jitter_us=0.0, baud_error=0.0, seed=1):
+    """Main-path decoders must reproduce the corpus words; returns the failing (decoder, capture) pairs."""
+    gpio_uart = GpioUart(None, data_pin=GpioUart.DATA_PIN)
+    cases = build_cases(corpus, jitter_us, baud_error, seed)
+    decoders = [
+        ("decode_bitstream", lambda d: gpio_uart.decode_uart(gpio_uart.decode_bitstream(d), 8, 1, 2)),
+        ("decode_edges", lambda d: gpio_uart.decode_uart(gpio_uart.decode_edges(d), 8, 1, 2)),
+        ("decode_pll", lambda d: gpio_uart.decode_uart(gpio_uart.decode_pll(d), 8, 1, 2)),
+    ]
+    try:
+        import gpio_uart_np
+        decoders.append(("numpy decode_bitstream", lambda d: gpio_uart_np.decode_uart(
+            gpio_uart_np.decode_bitstream([l for l, _ in d], [u for _, u in d])).tolist()))
+    except ImportError:
+        pass
+    failures = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, words, durations in cases:
+            for decoder, func in decoders:
+                if func(durations) != words:
+                    failures.append((decoder, name))
+    return failures
+
+
+def stream_words(durations, auto_baud=False):
+    """GpioUartStream over a (level, duration) list, as one burst."""
+    stream = GpioUartStream(auto_baud=auto_baud)
+    levels = []
+    ticks = []
+    tick = 0
+    for level, dur in durations:
+        levels.append(level)
+        ticks.append(tick & 0xFFFFFFFF)
+        tick += dur
+    return stream.feed(levels, ticks) + stream.end_burst(tick & 0xFFFFFFFF)
+
+
+def tolerance(corpus, jitter_us=0.0, seed=1, step=0.005, limit=0.2):
+    """
+    Sweep the baud error away from zero, slow and fast, until each decoder stops
+    reproducing every corpus capture. Prints the largest error each one survives.
+    """
+    gpio_uart = GpioUart(None, data_pin=GpioUart.DATA_PIN)
+
+    def measured(d):
+        estimate = estimate_bit_period(d, expected=38400)
+        return estimate.baud if estimate else 38400
+
+    decoders = [
+        ("decode_edges", lambda d: gpio_uart.decode_uart(gpio_uart.decode_edges(d), 8, 1, 2)),
+        ("decode_pll", lambda d: gpio_uart.decode_uart(gpio_uart.decode_pll(d), 8, 1, 2)),
+        ("GpioUartStream", lambda d: stream_words(d)),
+        ("decode_edges + estimate", lambda d: gpio_uart.decode_uart(gpio_uart.decode_edges(d, measured(d)), 8, 1, 2)),
+        ("decode_pll + estimate", lambda d: gpio_uart.decode_uart(gpio_uart.decode_pll(d, measured(d)), 8, 1, 2)),
+        ("GpioUartStream auto_baud", lambda d: stream_words(d, auto_baud=True)),
+    ]
+    limits = {name: [0.0, 0.0] for name, _ in decoders}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for side, sign in ((0, -1), (1, 1)):
+            alive = list(decoders)
+            err = step
+            while alive and err <= limit + 1e-9:
+                cases = build_cases(corpus, jitter_us, sign * err, seed)
+                alive = [(name, func) for name, func in alive
+                         if all(func(durations) == words for _, words, durations in cases)]
+                for name, _ in alive:
+                    limits[name][side] = err
+                err += step
+    print(f"Max baud error reproducing all {len(corpus)} captures (jitter +/-{jitter_us} us, step {step:.1%})")
+    print(f"{'decoder':<30} {'fast':>8} {'slow':>8}")
+    for name, _ in decoders:
+        fast, slow = limits[name]
+        print(f"{name:<30} {-fast:>+8.1%} {slow:>+8.1%}")
+    return limits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decoder throughput benchmark and corpus regression gate.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="edge jitter, +/- us")
+    parser.add_argument("--baud-error", type=float, default=0.0, help="relative bit period error (0.01 = 1%% slow)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--gate-only", action="store_true", help="only run the regression gate")
+    parser.add_argument("--tolerance", action="store_true", help="also sweep the baud error each decoder survives")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    if not args.gate_only:
+        run(corpus, args.jitter, args.baud_error, args.repeat, args.seed)
+        if args.tolerance:
+            tolerance(corpus, args.jitter, args.seed)
+
+    failures = gate(corpus, args.jitter, args.baud_error, args.seed)
+    if failures:
+        for decoder, name in failures:
+            print(f"GATE FAIL: {decoder} does not reproduce {name}")
+        sys.exit(1)
+    print(f"Gate OK: {len(corpus)} captures reproduced by all main-path decoders.")
+
+
+if __name__ == "__main__":
+    main()
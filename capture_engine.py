@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import pigpio
+
+from gpio_uart import GpioUartStream
+
+class CaptureEngine:
+    """
+    asyncio front end for HardUart and GpioUart.
+    Each channel is woken by its own source (serial fd readable, notification pipe
+    readable, or the pigpio callback thread) and closes its frame from a timer set to
+    HardUart.gap_sec / GpioUart.GAP_MS after the last activity, so there is no fixed
+    poll interval. Completed frames go to self.frames as (name, payload, now, delta):
+    payload is the frame (a memoryview from HardUart.take_frame) for the serial
+    channel and the closed (levels, ticks) snapshot for the GPIO channel; delta is the
+    silence since the channel's last activity, in seconds.
+    With stream_words, GPIO words are also decoded while the burst is still arriving
+    and queued as ("RX_AVR_WORDS", [values], now, None) as soon as each is complete;
+    the "RX_AVR" end-of-burst event follows as before; auto_baud measures the bit
+    period of each burst for the word stream (see GpioUartStream).
+    """
+    def __init__(self, hard_uart, gpio_uart, stream_words=False, baud=38400, auto_baud=False):
+        self.hard_uart = hard_uart
+        self.gpio_uart = gpio_uart
+        self.stream = GpioUartStream(baud, auto_baud=auto_baud) if stream_words else None
+        self.fed = 0    # transitions of the open capture already fed to self.stream
+        self.loop = None
+        self.frames = None
+        self.serial_timer = None
+        self.gpio_timer = None
+        self.gpio_wake_pending = False
+        self.gpio_fd = None
+
+    def start(self):
+        """Register the readers on the running loop."""
+        self.loop = asyncio.get_running_loop()
+        self.frames = asyncio.Queue()
+
+        self.loop.add_reader(self.hard_uart.ser.fileno(), self.on_serial)
+
+        if self.gpio_uart.bb_serial:
+            raise ValueError("CaptureEngine needs edge capture (init_notify or init_pigpio), not bb_serial")
+        if self.gpio_uart.notify:
+            self.gpio_fd = self.gpio_uart.notify.stream.fileno()
+            self.loop.add_reader(self.gpio_fd, self.on_gpio)
+        else:
+            self.gpio_uart.wakeup = self.wake_gpio
+
+    def stop(self):
+        self.loop.remove_reader(self.hard_uart.ser.fileno())
+        if self.gpio_fd is not None:
+            self.loop.remove_reader(self.gpio_fd)
+            self.gpio_fd = None
+        self.gpio_uart.wakeup = None
+        for timer in (self.serial_timer, self.gpio_timer):
+            if timer:
+                timer.cancel()
+
+    def restart_timer(self, timer, delay, func):
+        if timer:
+            timer.cancel()
+        return self.loop.call_later(delay, func)
+
+    # --- TX_AVR (hardware UART) ---
+
+    def on_serial(self):
+        hu = self.hard_uart
+        # read_bytes() only takes what is already buffered, so it never waits on SER_TIMEOUT
+        if hu.read_bytes():
+            self.serial_timer = self.restart_timer(self.serial_timer, hu.gap_sec, self.close_serial)
+
+    def close_serial(self):
+        hu = self.hard_uart
+        self.serial_timer = None
+        if not hu.pending():
+            return
+        now = time.monotonic()
+        delta = now - hu.last_rx
+        self.frames.put_nowait((hu.name, hu.take_frame(), now, delta))
+
+    # --- RX_AVR (GPIO edges) ---
+
+    def wake_gpio(self):
+        """Called on the pigpio callback thread; schedules at most one pending drain."""
+        if not self.gpio_wake_pending:
+            self.gpio_wake_pending = True
+            self.loop.call_soon_threadsafe(self.on_gpio)
+
+    def drain_gpio(self):
+        """Drain new edges; True if the open capture grew."""
+        gu = self.gpio_uart
+        self.gpio_wake_pending = False
+        last_event_tick = gu.last_event_tick
+        gu.poll_edges()
+        return bool(gu.ticks) and gu.last_event_tick != last_event_tick
+
+    def feed_stream(self):
+        gu = self.gpio_uart
+        if self.fed < len(gu.ticks):
+            values = self.stream.feed(gu.levels[self.fed:], gu.ticks[self.fed:])
+            self.fed = len(gu.ticks)
+            if values:
+                self.frames.put_nowait(("RX_AVR_WORDS", values, time.monotonic(), None))
+
+    def on_gpio(self):
+        if self.drain_gpio():
+            if self.stream:
+                self.feed_stream()
+            self.gpio_timer = self.restart_timer(self.gpio_timer, self.gpio_uart.GAP_MS / 1000.0, self.close_gpio)
+
+    def close_gpio(self):
+        gu = self.gpio_uart
+        self.gpio_timer = None
+        if self.drain_gpio():
+            # Edges were still queued behind the timer; the burst isn't over
+            if self.stream:
+                self.feed_stream()
+            self.gpio_timer = self.restart_timer(self.gpio_timer, gu.GAP_MS / 1000.0, self.close_gpio)
+            return
+        levels, ticks = snapshot = gu.take_snapshot()
+        if not ticks:
+            return
+        silence_us = pigpio.tickDiff(ticks[-1], gu.pi.get_current_tick())
+        # Close the last bit duration with a virtual transition GAP_MS later
+        end_tick = (ticks[-1] + gu.GAP_MS * 1000) & 0xFFFFFFFF
+        levels.append(levels[-1])
+        ticks.append(end_tick)
+        if self.stream:
+            values = self.stream.end_burst(end_tick)
+            self.fed = 0
+            if values:
+                self.frames.put_nowait(("RX_AVR_WORDS", values, time.monotonic(), None))
+        self.frames.put_nowait(("RX_AVR", snapshot, time.monotonic(), silence_us / 1000000.0))
+        if gu.held:
+            # The next burst's first edges were drained with this one's; start on them now
+            self.on_gpio()
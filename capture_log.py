@@ -0,0 +1,262 @@
+import os
+import struct
+import sys
+import time
+from array import array
+
+# Binary capture log.
+#
+#   file    := MAGIC record* [index trailer]
+#   record  := tag:u8 length:varint payload
+#
+#   GPIO ('G') payload: t_ns, pin, n_edges, first_tick, then n_edges varints of
+#                       (tick_delta << 1 | level); tick_delta is wraparound-safe (first is 0)
+#   UART ('U') payload: t_ns, delta_ns, name_len, name, frame bytes
+#   words ('W') payload: t_ns, pin, n_words, then n_words varints; 9-bit values already
+#                       decoded on the pigpiod side (GPIO_MODE "bb_serial"), no transitions
+#   index ('X') payload: count, then (offset delta, tag) per frame record
+#   trailer := index_offset:u64le TRAILER_MAGIC
+#
+# Varints are unsigned LEB128. t_ns is time.monotonic_ns() when the frame completed.
+# The writer only appends; reopening a log drops the trailer and index and appends
+# after the last complete record. Without a trailer (crash) the reader scans records.
+
+MAGIC = b'CYBCAP1\0'
+TRAILER_MAGIC = b'CYBIDX1\0'
+TRAILER = struct.Struct('<Q8s')
+
+TAG_GPIO = ord('G')
+TAG_UART = ord('U')
+TAG_WORDS = ord('W')
+TAG_INDEX = ord('X')
+FRAME_TAGS = (TAG_GPIO, TAG_UART, TAG_WORDS)
+
+
+def put_varint(out, value):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def get_varint(buf, pos):
+    value = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if b < 0x80:
+            return value, pos
+        shift += 7
+
+
+class CaptureLogWriter:
+    """Append-only writer used by main.main() / async_main()."""
+    def __init__(self, path):
+        self.path = path
+        self.index = []     # (offset, tag) of every frame record
+        if os.path.exists(path) and os.path.getsize(path) >= len(MAGIC):
+            reader = CaptureLogReader(path)
+            self.index = list(reader.index)
+            end = reader.data_end
+            reader.close()
+            self.f = open(path, 'r+b')
+            self.f.truncate(end)
+            self.f.seek(end)
+        else:
+            self.f = open(path, 'wb')
+            self.f.write(MAGIC)
+
+    def write_record(self, tag, payload):
+        offset = self.f.tell()
+        head = bytearray([tag])
+        put_varint(head, len(payload))
+        self.f.write(head)
+        self.f.write(payload)
+        self.f.flush()
+        if tag in FRAME_TAGS:
+            self.index.append((offset, tag))
+        return offset
+
+    def write_gpio(self, pin, levels, ticks, t_ns=None):
+        """Store a raw (levels, ticks) snapshot with delta-encoded ticks."""
+        out = bytearray()
+        put_varint(out, time.monotonic_ns() if t_ns is None else t_ns)
+        put_varint(out, pin)
+        put_varint(out, len(ticks))
+        prev = ticks[0] if ticks else 0
+        put_varint(out, prev)
+        for level, tick in zip(levels, ticks):
+            put_varint(out, (((tick - prev) & 0xFFFFFFFF) << 1) | (level & 1))
+            prev = tick
+        return self.write_record(TAG_GPIO, out)
+
+    def write_words(self, pin, values, t_ns=None):
+        """Store a burst of decoded 9-bit values (bit-bang serial mode)."""
+        out = bytearray()
+        put_varint(out, time.monotonic_ns() if t_ns is None else t_ns)
+        put_varint(out, pin)
+        put_varint(out, len(values))
+        for value in values:
+            put_varint(out, value)
+        return self.write_record(TAG_WORDS, out)
+
+    def write_uart(self, name, frame, now, delta):
+        """Store a HardUart frame; now/delta are the time.monotonic() seconds passed to report_frame."""
+        out = bytearray()
+        put_varint(out, round(now * 1e9))
+        put_varint(out, round(delta * 1e9))
+        name = name.encode()
+        put_varint(out, len(name))
+        out += name
+        out += frame
+        return self.write_record(TAG_UART, out)
+
+    def close(self):
+        """Write the footer index and trailer."""
+        if not self.f:
+            return
+        out = bytearray()
+        put_varint(out, len(self.index))
+        prev = 0
+        for offset, tag in self.index:
+            put_varint(out, offset - prev)
+            out.append(tag)
+            prev = offset
+        index_offset = self.write_record(TAG_INDEX, out)
+        self.f.write(TRAILER.pack(index_offset, TRAILER_MAGIC))
+        self.f.close()
+        self.f = None
+
+
+class CaptureLogReader:
+    """Random access to the frames of a capture log, by index or by scanning."""
+    def __init__(self, path):
+        self.f = open(path, 'rb')
+        if self.f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a capture log")
+        self.index = []
+        self.data_end = len(MAGIC)
+        if not self.load_index():
+            self.scan()
+
+    def close(self):
+        self.f.close()
+
+    def load_index(self):
+        size = self.f.seek(0, os.SEEK_END)
+        if size < len(MAGIC) + TRAILER.size:
+            return False
+        self.f.seek(size - TRAILER.size)
+        index_offset, magic = TRAILER.unpack(self.f.read(TRAILER.size))
+        if magic != TRAILER_MAGIC or index_offset >= size:
+            return False
+        tag, payload = self.read_record(index_offset)
+        if tag != TAG_INDEX:
+            return False
+        count, pos = get_varint(payload, 0)
+        offset = 0
+        for _ in range(count):
+            delta, pos = get_varint(payload, pos)
+            offset += delta
+            self.index.append((offset, payload[pos]))
+            pos += 1
+        self.data_end = index_offset
+        return True
+
+    def scan(self):
+        """Rebuild the index from the records; a torn record at the end is ignored."""
+        self.f.seek(len(MAGIC))
+        data = self.f.read()
+        pos = 0
+        base = len(MAGIC)
+        while pos < len(data):
+            try:
+                tag = data[pos]
+                length, body = get_varint(data, pos + 1)
+            except IndexError:
+                break
+            if body + length > len(data):
+                break
+            if tag in FRAME_TAGS:
+                self.index.append((base + pos, tag))
+            pos = body + length
+        self.data_end = base + pos
+
+    def read_record(self, offset):
+        self.f.seek(offset)
+        head = self.f.read(11)
+        length, body = get_varint(head, 1)
+        self.f.seek(offset + body)
+        return head[0], self.f.read(length)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        """
+        Returns ('G', t_ns, pin, levels, ticks), ('W', t_ns, pin, values) or
+        ('U', t_ns, delta_ns, name, frame); levels and ticks are parallel array('B') / array('I').
+        """
+        tag, payload = self.read_record(self.index[i][0])
+        t_ns, pos = get_varint(payload, 0)
+        if tag == TAG_GPIO:
+            pin, pos = get_varint(payload, pos)
+            count, pos = get_varint(payload, pos)
+            tick, pos = get_varint(payload, pos)
+            levels = array('B')
+            ticks = array('I')
+            for _ in range(count):
+                v, pos = get_varint(payload, pos)
+                tick = (tick + (v >> 1)) & 0xFFFFFFFF
+                levels.append(v & 1)
+                ticks.append(tick)
+            return ('G', t_ns, pin, levels, ticks)
+        if tag == TAG_WORDS:
+            pin, pos = get_varint(payload, pos)
+            count, pos = get_varint(payload, pos)
+            values = []
+            for _ in range(count):
+                v, pos = get_varint(payload, pos)
+                values.append(v)
+            return ('W', t_ns, pin, values)
+        delta_ns, pos = get_varint(payload, pos)
+        name_len, pos = get_varint(payload, pos)
+        name = bytes(payload[pos:pos + name_len]).decode()
+        pos += name_len
+        return ('U', t_ns, delta_ns, name, bytes(payload[pos:]))
+
+    def __iter__(self):
+        for i in range(len(self.index)):
+            yield self[i]
+
+
+def replay_text(path):
+    """Reproduce main.py's text hexdumps from a capture log."""
+    from gpio_uart import GpioUart
+    from hard_uart import HardUart
+    from main import report_gpio_snapshot, report_gpio_words
+
+    reader = CaptureLogReader(path)
+    gpio_uarts = {}
+    hard_uarts = {}
+    for record in reader:
+        if record[0] == 'G':
+            _, t_ns, pin, levels, ticks = record
+            if pin not in gpio_uarts:
+                gpio_uarts[pin] = GpioUart(None, data_pin=pin)
+            report_gpio_snapshot(gpio_uarts[pin], levels, ticks)
+        elif record[0] == 'W':
+            report_gpio_words(record[3])
+        else:
+            _, t_ns, delta_ns, name, frame = record
+            if name not in hard_uarts:
+                hard_uarts[name] = HardUart(port=None, baud=38400, gap_sec=0.01)
+                hard_uarts[name].name = name
+            hard_uarts[name].report_frame(frame, t_ns / 1e9, delta_ns / 1e9)
+    reader.close()
+
+
+if __name__ == "__main__":
+    replay_text(sys.argv[1] if len(sys.argv) > 1 else "capture.cap")
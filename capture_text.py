@@ -0,0 +1,141 @@
+import re
+import sys
+from array import array
+from collections import namedtuple
+
+# Streaming parser for the text logs main.py prints (results.txt, packet_*_{rx,tx}.txt).
+# The file is read in large binary chunks and walked line by line; frames are yielded
+# as soon as their block closes, so memory stays flat however long the log is.
+#
+#   RX block:  Silence duration: N us / Decoded bits: (N @ 12) / --- Stream K: N bytes ---
+#              / 0000:  132 1FF ... rows / --- Transaction Complete ---
+#   TX block:  --- TX_AVR: [T ms (D)ms] NEW FRAME (UART burst len=N) --- / 00000000  cf 00 ...
+#              rows / Checksum OK|mismatch ...
+
+CHUNK = 1 << 20
+
+SILENCE = re.compile(rb"^Silence duration: (\d+) us")
+BITS = re.compile(rb"^Decoded bits: \((\d+) @")
+STREAM = re.compile(rb"^--- Stream (\d+): (\d+) bytes ---")
+UART = re.compile(rb"^--- (\w+): \[([\d.]+)ms \(([\d.]+)\)ms\] NEW FRAME \(UART burst len=(\d+)\) ---")
+RX_ROW = re.compile(rb"^[0-9A-F]{4}:  ((?:[0-9A-F]{3} )*[0-9A-F]{3})")
+TX_ROW = re.compile(rb"^[0-9a-f]{8}  ((?:[0-9a-f]{2} )*[0-9a-f]{2})")
+
+# kind: "rx" (decoded GPIO stream, 9-bit words) or "tx" (HardUart frame, bytes)
+# name: "RX_AVR" or the UART name; line: 1-based line of the block header
+# length: the length the block header announced (None without a header; differs from
+#         len(words) if the log was cut short)
+# words: array('H') of the values; stream: stream number within the transaction (rx)
+# silence_us / bits: last "Silence duration" and "Decoded bits" count before the stream (rx)
+# time_ms / delta_ms: frame time and gap from the TX header; checksum_ok: True/False/None (tx)
+Frame = namedtuple("Frame", "kind name line length words stream silence_us bits time_ms delta_ms checksum_ok")
+
+
+def iter_lines(path, chunk_size=CHUNK):
+    with open(path, 'rb') as f:
+        tail = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop()
+            yield from lines
+        if tail:
+            yield tail
+
+
+def iter_frames(path, chunk_size=CHUNK):
+    """Yield a Frame for every RX stream and TX frame in a text log, in file order."""
+    frame = None        # [kind, name, line, length, words, stream, silence, bits, time, delta, checksum]
+    silence = None
+    bits = None
+    for n, line in enumerate(iter_lines(path, chunk_size), 1):
+        line = line.rstrip(b'\r')
+        m = RX_ROW.match(line)
+        if m:
+            # Rows without a "--- Stream" header (hand-split packet files) open a frame
+            # of their own, as does a row at address 0000 after other rows
+            if frame is None or frame[0] != "rx" or (frame[4] and line.startswith(b"0000:")):
+                if frame is not None:
+                    yield Frame(*frame)
+                frame = ["rx", "RX_AVR", n, None, array('H'), None, silence, bits, None, None, None]
+            frame[4].extend(int(w, 16) for w in m.group(1).split())
+            continue
+        if frame is not None and frame[0] == "tx":
+            m = TX_ROW.match(line)
+            if m:
+                frame[4].extend(bytes.fromhex(m.group(1).decode()))
+                continue
+        if not line.startswith((b"Silence", b"Decoded", b"---", b"Checksum")):
+            continue
+        m = SILENCE.match(line)
+        if m:
+            silence = int(m.group(1))
+            continue
+        m = BITS.match(line)
+        if m:
+            bits = int(m.group(1))
+            continue
+        m = STREAM.match(line)
+        if m:
+            if frame is not None:
+                yield Frame(*frame)
+            frame = ["rx", "RX_AVR", n, int(m.group(2)), array('H'), int(m.group(1)), silence, bits, None, None, None]
+            continue
+        if line.startswith(b"--- Transaction Complete"):
+            if frame is not None:
+                yield Frame(*frame)
+                frame = None
+            silence = None
+            bits = None
+            continue
+        m = UART.match(line)
+        if m:
+            if frame is not None:
+                yield Frame(*frame)
+            frame = ["tx", m.group(1).decode(), n, int(m.group(4)), array('H'), None, None, None,
+                     float(m.group(2)), float(m.group(3)), None]
+            continue
+        if line.startswith(b"Checksum") and frame is not None and frame[0] == "tx":
+            frame[10] = line.startswith(b"Checksum OK")
+            yield Frame(*frame)
+            frame = None
+    if frame is not None:
+        yield Frame(*frame)
+
+
+def frames_to_numpy(frames):
+    """
+    Pack frames into flat NumPy arrays: (values uint16, offsets int64, is_tx bool), with
+    frame i in values[offsets[i]:offsets[i + 1]].
+    """
+    import numpy as np
+
+    values = array('H')
+    offsets = array('q', [0])
+    is_tx = array('b')
+    for frame in frames:
+        values.extend(frame.words)
+        offsets.append(len(values))
+        is_tx.append(frame.kind == "tx")
+    return np.frombuffer(values, dtype=np.uint16), np.frombuffer(offsets, dtype=np.int64), np.frombuffer(is_tx, dtype=np.bool_)
+
+
+def main(paths):
+    for path in paths:
+        counts = {"rx": 0, "tx": 0}
+        words = {"rx": 0, "tx": 0}
+        bad_checksum = 0
+        short = 0
+        for frame in iter_frames(path):
+            counts[frame.kind] += 1
+            words[frame.kind] += len(frame.words)
+            bad_checksum += frame.checksum_ok is False
+            short += frame.length is not None and len(frame.words) != frame.length
+        print(f"{path}: {counts['rx']} RX streams ({words['rx']} words), {counts['tx']} TX frames "
+              f"({words['tx']} bytes, {bad_checksum} checksum mismatches), {short} incomplete", flush=True)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["results.txt"])
@@ -0,0 +1,138 @@
+import sys
+from collections import namedtuple
+
+# Packet framing for decoded Cybiko streams: 9-bit words from GpioUart.decode_uart or
+# bytes from HardUart frames. Packets start at a two-word header, compared on the full
+# word: HEADERS (0x4D 0xC0 / 0x4D 0xE0) for bytes, WORD_HEADERS (14D/04D followed by
+# 1C0/1E0) for 9-bit words. A header may be led in by a run of preamble words (0xFF, or
+# 0x1FF in 9-bit streams) and, in 9-bit streams, an address/opcode word with the 9th bit set:
+#
+#   RX:  132 1FF 1FF 1FF 1FF 14D 1E0 183 064 ...
+#        op  preamble........ header  body
+#
+# A preamble run of at least MIN_PREAMBLE words also starts a packet when no known header
+# follows it (e.g. 1C8 1FF 1FF 1FF 1FF 00D 1E0 ...).
+# frame_packets() makes one pass over the stream, so framing is linear in its length.
+
+HEADERS = ((0x4D, 0xC0), (0x4D, 0xE0))
+PREAMBLE = 0xFF
+WORD_HEADERS = ((0x14D, 0x1C0), (0x14D, 0x1E0), (0x04D, 0x1C0), (0x04D, 0x1E0))
+WORD_PREAMBLE = 0x1FF
+MIN_PREAMBLE = 3
+
+# kind: "packet" (starts at a header), "preamble" (preamble run, no known header after it)
+#       or "raw" (words before the first packet)
+# offset/end: slice of the stream covered by the record, lead-in included
+# header_offset: index of the header, or of the first word after the preamble (None for raw)
+# header: the two header words (None unless kind is "packet")
+# opcode: the 9th-bit lead-in word, or None; preamble: length of the preamble run
+Packet = namedtuple("Packet", "kind offset end header_offset header opcode preamble")
+
+
+def frame_packets(words, headers=HEADERS, lead_in=True, preamble=PREAMBLE):
+    """
+    Split a stream into Packet records. Each packet runs up to the start of the next
+    one; with lead_in=False packets start exactly at their header. Words are compared
+    whole, so 9-bit streams need WORD_HEADERS and WORD_PREAMBLE:
+
+    >>> words = [0x132, 0x1FF, 0x1FF, 0x1FF, 0x14D, 0x1E0, 0x183]
+    >>> [p.kind for p in frame_packets(words)]
+    ['raw']
+    >>> p = frame_packets(words, WORD_HEADERS, preamble=WORD_PREAMBLE)[0]
+    >>> p.kind, p.offset, p.header_offset, hex(p.opcode), p.preamble
+    ('packet', 0, 4, '0x132', 3)
+    """
+    follow = {}
+    for header in headers:
+        if len(header) != 2:
+            raise ValueError(f"headers must be two bytes, got {header!r}")
+        follow.setdefault(header[0], set()).add(header[1])
+
+    starts = []         # (kind, offset, header_offset, header, opcode, preamble)
+    boundary = 0        # lead-ins never reach back into the previous packet's start
+    run_start = 0       # current preamble run is words[run_start:run_end]
+    run_end = -1
+    prev = None
+
+    def lead(offset):
+        """Extend a packet start back over a 9th-bit address/opcode word."""
+        if lead_in and offset > boundary and words[offset - 1] > 0xFF and words[offset - 1] != preamble:
+            return offset - 1, words[offset - 1]
+        return offset, None
+
+    for i, b in enumerate(words):
+        second = follow.get(prev)
+        if second and b in second:
+            h = i - 1
+            offset = h
+            run = 0
+            if lead_in and run_end == h and run_start >= boundary:
+                run = h - run_start
+                offset = run_start
+            offset, opcode = lead(offset)
+            starts.append(("packet", offset, h, (prev, b), opcode, run))
+            boundary = i + 1
+            prev = None     # header bytes cannot begin another header
+            continue
+        if b == preamble:
+            if run_end != i:
+                run_start = i
+            run_end = i + 1
+        elif lead_in and run_end == i and i - run_start >= MIN_PREAMBLE and run_start >= boundary:
+            # A preamble just ended; unless a header follows (handled on the next word), it starts a packet
+            nxt = follow.get(b)
+            if not (nxt and i + 1 < len(words) and words[i + 1] in nxt):
+                offset, opcode = lead(run_start)
+                starts.append(("preamble", offset, i, None, opcode, i - run_start))
+                boundary = i
+        prev = b
+
+    packets = []
+    first = starts[0][1] if starts else len(words)
+    if first > 0:
+        packets.append(Packet("raw", 0, first, None, None, None, 0))
+    for k, (kind, offset, h, header, opcode, preamble) in enumerate(starts):
+        end = starts[k + 1][1] if k + 1 < len(starts) else len(words)
+        packets.append(Packet(kind, offset, end, h, header, opcode, preamble))
+    return packets
+
+
+def print_packets(words, packets, width=3):
+    for n, p in enumerate(packets):
+        body = " ".join(f"{w:0{width}X}" for w in words[p.offset:p.end])
+        if p.kind != "raw":
+            op = f"op={p.opcode:03X} " if p.opcode is not None else ""
+            hdr = f"hdr={p.header[0]:02X} {p.header[1]:02X}" if p.header else "hdr=?"
+            print(f"Pkt {n+1} @{p.offset}: {op}pre={p.preamble} {hdr} len={p.end - p.offset}", flush=True)
+        else:
+            print(f"Raw {n+1} @{p.offset}: len={p.end - p.offset}", flush=True)
+        print(f"      {body}", flush=True)
+
+
+def main(path):
+    """Frame every GPIO and UART frame of a capture log."""
+    from capture_log import CaptureLogReader
+    from gpio_uart import GpioUart
+
+    reader = CaptureLogReader(path)
+    gpio_uart = GpioUart(None, data_pin=GpioUart.DATA_PIN)
+    for record in reader:
+        if record[0] == 'G':
+            durations = gpio_uart.analyze_transitions(record[3], record[4])
+            for stream in gpio_uart.split_durations_by_long_idle(durations, baud=38400, threshold_bits=20):
+                words = gpio_uart.decode_uart(gpio_uart.decode_edges(stream, baud=38400), 8, 1, 2)
+                print(f"--- RX_AVR: {len(words)} words ---", flush=True)
+                print_packets(words, frame_packets(words, WORD_HEADERS, preamble=WORD_PREAMBLE))
+        elif record[0] == 'W':
+            words = record[3]
+            print(f"--- RX_AVR: {len(words)} words ---", flush=True)
+            print_packets(words, frame_packets(words, WORD_HEADERS, preamble=WORD_PREAMBLE))
+        else:
+            frame = record[4]
+            print(f"--- {record[3]}: {len(frame)} bytes ---", flush=True)
+            print_packets(frame, frame_packets(frame), width=2)
+    reader.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "capture.cap")
@@ -0,0 +1,55 @@
+from array import array
+
+class EdgeRing:
+    """
+    Preallocated single-producer/single-consumer ring of (level, tick) edges.
+    The pigpio callback thread is the only writer and the main loop the only reader,
+    so each cursor has exactly one owner and no lock is needed.
+    """
+    def __init__(self, capacity=1 << 16):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.levels = array('B', bytes(capacity))
+        self.ticks = array('I', bytes(4 * capacity))
+        self.write = 0      # only advanced by the producer
+        self.read = 0       # only advanced by the consumer
+        self.dropped = 0    # edges lost because the ring was full
+
+    def __len__(self):
+        return self.write - self.read
+
+    def push(self, level, tick):
+        """Producer side. Stores the edge, then publishes it by moving the write cursor."""
+        w = self.write
+        if w - self.read >= self.capacity:
+            self.dropped += 1
+            return False
+        i = w & self.mask
+        self.levels[i] = level
+        self.ticks[i] = tick
+        self.write = w + 1
+        return True
+
+    def drain(self, max_edges=None):
+        """
+        Consumer side. Returns the pending edges as parallel (levels, ticks) arrays,
+        oldest first, and frees their slots. Nothing is allocated per edge.
+        """
+        r = self.read
+        w = self.write
+        if max_edges is not None:
+            w = min(w, r + max_edges)
+        if w == r:
+            return self.levels[:0], self.ticks[:0]
+        start = r & self.mask
+        end = w & self.mask
+        if start < end:
+            levels = self.levels[start:end]
+            ticks = self.ticks[start:end]
+        else:
+            levels = self.levels[start:] + self.levels[:end]
+            ticks = self.ticks[start:] + self.ticks[:end]
+        self.read = w
+        return levels, ticks
@@ -0,0 +1,111 @@
+import sys
+
+import numpy as np
+
+# Batch analysis of HardUart frames with NumPy: the per-frame metrics of
+# HardUart.report_frame/print_frame (checksum, XOR against the previous frame, MSB
+# column) computed over whole captures at once. Frames are grouped by length and
+# stacked into (n_frames, length) uint8 matrices. 1-byte frames have no checksum, as
+# in print_frame. The XOR differs on purpose: print_frame only XORs a frame against the
+# one just before it when both have the same length, which on real traffic (commands
+# and replies of different lengths interleaved) almost never happens. Here each frame
+# is XORed against the last earlier frame of the same length, i.e. the previous row of
+# its group, so the heatmap shows how each message type changes over the capture.
+
+
+def stack_frames(frames):
+    """
+    Group frames by length. Returns {length: (index, matrix)}: index holds the positions
+    of the frames in the input, matrix is the (len(index), length) uint8 stack.
+    """
+    groups = {}
+    for i, frame in enumerate(frames):
+        groups.setdefault(len(frame), []).append(i)
+    stacks = {}
+    for length, index in groups.items():
+        if length == 0:
+            continue
+        matrix = np.frombuffer(b"".join(bytes(frames[i]) for i in index), dtype=np.uint8)
+        stacks[length] = (np.array(index), matrix.reshape(len(index), length))
+    return stacks
+
+
+def checksums(matrix):
+    """(computed, received, ok) per row: sum of all but the last byte & 0xFF vs the last byte."""
+    computed = (matrix[:, :-1].sum(axis=1, dtype=np.uint32) & 0xFF).astype(np.uint8)
+    received = matrix[:, -1]
+    return computed, received, computed == received
+
+
+def xor_previous(index, matrix):
+    """
+    (xor, has_xor): each row XOR the row before it, i.e. the last earlier frame of the
+    same length. The first row has nothing to compare with: it is all zero and its
+    has_xor is False.
+    """
+    xor = np.zeros_like(matrix)
+    xor[1:] = matrix[1:] ^ matrix[:-1]
+    has_xor = np.ones(len(index), dtype=bool)
+    has_xor[:1] = False
+    return xor, has_xor
+
+
+def change_heatmap(xor):
+    """Per column, how many frames changed that byte relative to the previous frame of their length."""
+    return np.count_nonzero(xor, axis=0)
+
+
+def msb_bits(matrix):
+    """Bit 7 of every byte as a 0/1 matrix (the MSB column of print_frame)."""
+    return matrix >> 7
+
+
+def analyze_frames(frames):
+    """
+    Run all the metrics per length group. Returns {length: dict} with the keys
+    index, frames, computed, received, checksum_ok, xor, has_xor, heatmap and msb.
+    computed, received and checksum_ok are None for 1-byte frames.
+    """
+    results = {}
+    for length, (index, matrix) in stack_frames(frames).items():
+        computed, received, ok = checksums(matrix) if length > 1 else (None, None, None)
+        xor, has_xor = xor_previous(index, matrix)
+        results[length] = {
+            "index": index,
+            "frames": matrix,
+            "computed": computed,
+            "received": received,
+            "checksum_ok": ok,
+            "xor": xor,
+            "has_xor": has_xor,
+            "heatmap": change_heatmap(xor),
+            "msb": msb_bits(matrix),
+        }
+    return results
+
+
+def print_summary(results):
+    for length in sorted(results):
+        r = results[length]
+        n = len(r["index"])
+        checked = f"checksum OK {int(r['checksum_ok'].sum())}/{n}" if r["checksum_ok"] is not None else "no checksum"
+        print(f"len={length}: {n} frames, {checked}", flush=True)
+        xored = int(r["has_xor"].sum())
+        if xored:
+            # One hex digit per byte: share of XORed frames that changed it, 0-F
+            scale = np.minimum(r["heatmap"] * 16 // xored, 15)
+            print("  changed: " + "".join(f"{v:x}" for v in scale), flush=True)
+
+
+def main(path):
+    """Summarise the UART frames of a capture log."""
+    from capture_log import CaptureLogReader
+
+    reader = CaptureLogReader(path)
+    frames = [record[4] for record in reader if record[0] == 'U']
+    reader.close()
+    print_summary(analyze_frames(frames))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "capture.cap")
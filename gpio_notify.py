@@ -0,0 +1,105 @@
+import os
+import struct
+
+class NotifyCapture:
+    """
+    Bulk edge capture through pigpio's notification pipe (/dev/pigpioN).
+    Reads the 12-byte gpioReport records in large chunks and turns level changes on
+    the watched pins into (gpio, level, tick) edges, the same as pi.callback would,
+    without one socket dispatch per edge.
+    Pass a binary stream (e.g. a recorded pipe dump) to use it without a daemon.
+    pipe_path: format string for a handle's pipe; by default the pi's notify_pipe_path
+    if it has one (a simulated daemon), else PIPE_PATH.
+    """
+    REPORT = struct.Struct('HHII')  # seqno, flags, tick, level
+    CHUNK = REPORT.size * 4096
+    PIPE_PATH = "/dev/pigpio{}"     # notification pipe of a handle
+
+    def __init__(self, pi, pins, stream=None, last_level=0, pipe_path=None):
+        self.pi = pi
+        self.pipe_path = pipe_path or getattr(pi, "notify_pipe_path", self.PIPE_PATH)
+        self.pins = list(pins)
+        self.bits = 0
+        for pin in self.pins:
+            self.bits |= 1 << pin
+        self.stream = stream
+        self.handle = None
+        self.last_level = last_level
+        self.last_seq = None
+        self.seq_gaps = 0       # reports missing from the sequence (pipe overrun)
+        self.pending = b''
+
+    def start(self):
+        """Open a notification pipe on the daemon and start reporting the watched pins."""
+        self.handle = self.pi.notify_open()
+        if self.handle < 0:
+            raise RuntimeError(f"notify_open failed ({self.handle})")
+        self.stream = open(self.pipe_path.format(self.handle), "rb", buffering=0)
+        # A raw non-blocking read returns None when the pipe is empty
+        os.set_blocking(self.stream.fileno(), False)
+        self.last_level = self.pi.read_bank_1()
+        self.pi.notify_begin(self.handle, self.bits)
+
+    def stop(self):
+        if self.handle is not None:
+            self.pi.notify_close(self.handle)
+            self.handle = None
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+    def read(self):
+        """Raw report bytes buffered in the pipe (b'' if none)."""
+        data = self.stream.read(self.CHUNK) if self.stream else None
+        return data or b''
+
+    def poll(self, func):
+        """Read whatever the pipe has buffered and call func(gpio, level, tick) for each edge."""
+        data = self.read()
+        if not data:
+            return 0
+        return self.feed(data, func)
+
+    def skip(self, data):
+        """
+        Consume report bytes without emitting edges.
+        Only the last complete record is decoded, to keep last_level and the sequence current.
+        """
+        if self.pending:
+            data = self.pending + data
+        usable = len(data) - (len(data) % self.REPORT.size)
+        self.pending = bytes(data[usable:])
+        if usable:
+            seq, flags, tick, level = self.REPORT.unpack_from(data, usable - self.REPORT.size)
+            self.last_seq = seq
+            if not flags:
+                self.last_level = level
+
+    def feed(self, data, func):
+        """Parse a chunk of raw report bytes. Partial records are kept for the next call."""
+        if self.pending:
+            data = self.pending + data
+        usable = len(data) - (len(data) % self.REPORT.size)
+        self.pending = bytes(data[usable:])
+
+        pins = self.pins
+        last_level = self.last_level
+        last_seq = self.last_seq
+        edges = 0
+        for seq, flags, tick, level in self.REPORT.iter_unpack(memoryview(data)[:usable]):
+            if last_seq is not None and seq != ((last_seq + 1) & 0xFFFF):
+                self.seq_gaps += (seq - last_seq - 1) & 0xFFFF
+            last_seq = seq
+            if flags:
+                # Watchdog, keep-alive and event reports carry no edges
+                continue
+            changed = (level ^ last_level) & self.bits
+            last_level = level
+            if changed:
+                for pin in pins:
+                    if changed & (1 << pin):
+                        func(pin, (level >> pin) & 1, tick)
+                        edges += 1
+        self.last_level = last_level
+        self.last_seq = last_seq
+        return edges
@@ -0,0 +1,121 @@
+import sys
+
+# SPI sniffing from recorded edges. SCK and the data lines (MOSI and/or MISO) are captured
+# together (MultiCapture notification stream or callbacks) instead of calling pi.read() from
+# the clock callback: each data level is reconstructed at the tick of the sampling clock
+# edge from the stored transitions, so nothing happens per edge on the pigpio side and the
+# sample is the level at the clock edge, not some socket round-trip later.
+#
+#   CPOL 0: SCK idles low; CPOL 1: idles high
+#   CPHA 0: sample on the leading (first) clock edge; CPHA 1: on the trailing edge
+#
+# A frame ends after GAP_MS without clock edges. The clock rate is bounded by the pigpiod
+# sample rate (-s, default 5 us): SCK half-periods must span at least one sample, so at the
+# default rate SCK tops out around 100 kHz (1 MHz with -s 1). A faster clock is not decoded:
+# pulses between two samples are never seen and the bits they carry are lost. pigpiod
+# reports a pin's edges at least one sample apart, so a clock at or past the limit shows up
+# as SCK edges SAMPLE_US apart (or less, in synthetic captures); decode_spi warns on those.
+
+SCK_PIN = 11
+DATA_PINS = [9]         # MISO (RX_AVR); add MOSI here to decode both directions
+CPOL = 0
+CPHA = 0
+LSB_FIRST = False
+BITS = 8
+GAP_MS = 20
+SAMPLE_US = 5           # pigpiod sample period (pigpiod -s); set to match the daemon
+
+
+def sample_level(cpol, cpha):
+    """SCK level right after a sampling edge."""
+    leading = 1 - cpol
+    return leading if cpha == 0 else cpol
+
+
+def decode_spi(snapshot, initial_levels, sck, data_pins, cpol=CPOL, cpha=CPHA, lsb_first=LSB_FIRST, bits=BITS,
+               sample_us=SAMPLE_US):
+    """
+    Decode one frame of [(pin, level, tick), ...] edges (SCK and data pins interleaved in
+    capture order). initial_levels: {pin: level} before the first edge.
+    Returns {data pin: (bytes, trailing bits, n trailing bits)}; a frame that stops mid-word
+    leaves its last bits in trailing bits.
+    A data edge on the same tick as the sampling clock edge is taken as after it: the
+    level sampled is the one the line held before the clock edge. With CPHA 1 a trailing
+    edge only samples once a leading edge has been seen (SCK settling to its idle level
+    at the start of a frame is not a bit).
+    SCK edges at most sample_us apart are counted and reported: the clock is at or past
+    what pigpiod can sample and bits may be missed.
+    """
+    sample_at = sample_level(cpol, cpha)
+    clocked = cpha == 0
+    levels = {pin: initial_levels.get(pin, 0) for pin in data_pins}
+    changed = {pin: None for pin in data_pins}     # tick of the last change
+    before = dict(levels)                          # level before that change
+    words = {pin: bytearray() for pin in data_pins}
+    shift = {pin: 0 for pin in data_pins}
+    count = 0
+    last_sck = None
+    too_fast = 0
+    for pin, level, tick in snapshot:
+        if pin == sck:
+            if last_sck is not None and (tick - last_sck) & 0xFFFFFFFF <= sample_us:
+                too_fast += 1
+            last_sck = tick
+            if level != sample_at:
+                clocked = True
+                continue
+            if not clocked:
+                continue
+            count += 1
+            for data_pin in data_pins:
+                value = before[data_pin] if changed[data_pin] == tick else levels[data_pin]
+                if lsb_first:
+                    shift[data_pin] |= value << (count - 1)
+                else:
+                    shift[data_pin] = (shift[data_pin] << 1) | value
+            if count == bits:
+                for data_pin in data_pins:
+                    words[data_pin].append(shift[data_pin])
+                    shift[data_pin] = 0
+                count = 0
+        elif pin in levels:
+            if changed[pin] != tick:
+                before[pin] = levels[pin]
+            levels[pin] = level
+            changed[pin] = tick
+    if too_fast:
+        print(f"SPI: {too_fast} SCK edges {sample_us} us or less apart; the clock is at or past "
+              f"the pigpiod sample rate and bits may be missed", flush=True)
+    return {pin: (bytes(words[pin]), shift[pin], count) for pin in data_pins}
+
+
+def format_hexdump(data):
+    """Aligned hex and ASCII strings, as archive/spi_test.py printed them."""
+    hex_str = " ".join(f"{b:02x}" for b in data)
+    ascii_str = "".join(chr(b) if 32 <= b <= 126 else '.' for b in data)
+    return hex_str, ascii_str
+
+
+def print_frame(name, decoded):
+    lines = []
+    for pin, (data, rest, nbits) in decoded.items():
+        if not data and not nbits:
+            continue
+        lines.append(f"\n--- {name} GPIO {pin}: Packet Captured ({len(data)} bytes) ---")
+        hex_out, ascii_out = format_hexdump(data)
+        lines.append(f"HEX:  {hex_out}")
+        lines.append(f"ASCII: {ascii_out}")
+        if nbits:
+            lines.append(f"Trailing {nbits} bits: {rest:0{nbits}b}")
+    if lines:
+        print("\n".join(lines), flush=True)
+
+
+def main(mode="notify"):
+    """Stand-alone sniffer on SCK_PIN / DATA_PINS (what archive/spi_test.py did)."""
+    import multi_capture
+    multi_capture.main([("spi", "SPI", [SCK_PIN] + DATA_PINS)], mode)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "notify")
@@ -1,5 +1,32 @@
+import math
+import sys
+import time
+from array import array
+from bisect import bisect_right
+
 import pigpio
 
+from edge_ring import EdgeRing
+from baud_estimate import ESTIMATE_EDGES, estimate_bit_period
+from gpio_notify import NotifyCapture
+from metrics import METRICS
+
+def hunt_advance(t, k):
+    """
+    Same result as k repeated 't += 1' steps of the decode_bitstream hunt loop.
+    Exact within a binade; the one rounding step is done for real at each binade crossing.
+    """
+    while k > 0:
+        top = 2.0 ** math.frexp(t)[1]
+        j = min(k, math.ceil(top - t) - 1)
+        if j > 0:
+            t += j
+            k -= j
+        if k > 0:
+            t += 1
+            k -= 1
+    return t
+
 class GpioUart:
     DATA_PIN = 9   # The GPIO pin to analyze (e.g., RX_AVR)
     BITS = 11
@@ -7,32 +34,98 @@ class GpioUart:
     LONG_WORD = BITS * WORD
     GAP_MS = 10
 
+    RING_SIZE = 1 << 16  # edges buffered between the pigpio callback and the main loop
+    BB_BITS = 11         # bit-bang reader word: 8 data + parity/address + the 2 stop bits
+    BB_STOP = 0x600      # stop bits of a BB_BITS word; both must read 1
+    BB_POLL_S = 0.002    # poll_bb call period; bursts less than GAP_MS + this apart merge
+
     def __init__(self, pi, data_pin: int):
         self.pi = pi
         self.data_pin = data_pin
         self.pi = None
         self.callback = None
-        self.transitions = []
+        self.notify = None
+        self.wakeup = None          # optional hook called after each callback edge (e.g. CaptureEngine)
+        self.bb_serial = False
+        self.bb_buf = bytearray()
+        self.bb_raw = bytearray()   # notification reports for the current burst, parsed only on fallback
+        self.bb_last_rx = None
+        self.bb_framing_errors = 0
+        self.ring = EdgeRing(self.RING_SIZE)
+        self.dropped = 0
+        self.levels = array('B')    # open capture: level after each edge
+        self.ticks = array('I')     # and its tick (parallel to levels)
+        self.held = None            # (levels, ticks) drained after the gap that ended the open capture
         self.capturing = False
         self.last_event_tick = 0
         self.last_idle_tick = 0
-        self.transitions = []
 
-    def init_pigpio(self):
-        def data_callback(gpio, level, tick):
-            if not self.capturing:
-                if level == 0: 
-                    # Measure from the last time it went HIGH until NOW (the falling edge)
-                    if pigpio.tickDiff(self.last_idle_tick, tick) > (self.GAP_MS * 1000):
-                        self.transitions = [(0, tick)]
-                        self.capturing = True
-                else:
-                    # Mark the time the line went HIGH
-                    self.last_idle_tick = tick
+    def poll_edges(self):
+        """
+        Drain the edge ring into self.levels / self.ticks (main loop side).
+        A capture starts on the first falling edge after GAP_MS of idle; from there on
+        the drained arrays are appended in bulk. New edges more than GAP_MS after the last
+        captured one belong to the next burst, however late this poll runs: they are held
+        back (last_event_tick stays put, so the caller sees the gap) until take_snapshot.
+        Returns the number of edges drained.
+        """
+        if self.notify:
+            self.notify.poll(self.on_edge)
+        levels, ticks = self.ring.drain()
+        n = len(ticks)
+        METRICS.count("edges", n)
+        if self.ring.dropped != self.dropped:
+            print(f"Edge ring overflow: {self.ring.dropped - self.dropped} edges dropped", flush=True)
+            METRICS.count("edges_dropped", self.ring.dropped - self.dropped)
+            self.dropped = self.ring.dropped
+        if self.held:
+            held_levels, held_ticks = self.held
+            levels = held_levels + levels
+            ticks = held_ticks + ticks
+            self.held = None
+            if self.capturing:
+                self.held = (levels, ticks)
+                return n
+        i = 0
+        while not self.capturing and i < len(ticks):
+            if levels[i] == 0:
+                # Measure from the last time it went HIGH until NOW (the falling edge)
+                if pigpio.tickDiff(self.last_idle_tick, ticks[i]) > (self.GAP_MS * 1000):
+                    self.levels = array('B')
+                    self.ticks = array('I')
+                    self.capturing = True
+                    break
             else:
-                self.transitions.append((level, tick))
-                self.last_event_tick = tick
+                # Mark the time the line went HIGH
+                self.last_idle_tick = ticks[i]
+            i += 1
+        if self.capturing and i < len(ticks):
+            if self.ticks and pigpio.tickDiff(self.last_event_tick, ticks[i]) > (self.GAP_MS * 1000):
+                self.held = (levels[i:], ticks[i:])
+            else:
+                self.levels.extend(levels[i:] if i else levels)
+                self.ticks.extend(ticks[i:] if i else ticks)
+                self.last_event_tick = ticks[-1]
+        return n
 
+    def take_snapshot(self):
+        """
+        Hand the captured (levels, ticks) arrays to the caller and re-arm for the next
+        start bit.
+        """
+        snapshot = (self.levels, self.ticks)
+        self.levels = array('B')
+        self.ticks = array('I')
+        self.capturing = False
+        return snapshot
+
+    def on_edge(self, gpio, level, tick):
+        """Edge sink for pi.callback and NotifyCapture (pigpio callback signature); only fills the ring."""
+        self.ring.push(level, tick)
+        if self.wakeup:
+            self.wakeup()
+
+    def connect(self):
         self.pi = pigpio.pi()
         if not self.pi.connected:
             print("Error: Could not connect to pigpiod. Is it running?", flush=True)
@@ -47,12 +140,130 @@ class GpioUart:
         # self.pi.set_glitch_filter(self.data_pin, 2)
         # print("Glitch filter set to 15 us.", flush=True)
 
+    def init_pigpio(self):
+        self.connect()
+
         # Create the callback that will fire on each signal change
-        self.callback = self.pi.callback(self.data_pin, pigpio.EITHER_EDGE, data_callback)
+        self.callback = self.pi.callback(self.data_pin, pigpio.EITHER_EDGE, self.on_edge)
         self.last_event_tick = self.pi.get_current_tick()
         self.last_idle_tick = self.pi.get_current_tick() - (self.GAP_MS * 2000)
         print(f"Initialized GPIO UART on pin {self.data_pin}.", flush=True)
 
+    def init_notify(self):
+        """
+        Like init_pigpio, but reads edges in bulk from a pigpio notification pipe
+        instead of one Python callback per edge. poll_edges() pulls from the pipe.
+        """
+        self.connect()
+
+        self.notify = NotifyCapture(self.pi, [self.data_pin])
+        self.notify.start()
+        self.last_event_tick = self.pi.get_current_tick()
+        self.last_idle_tick = self.pi.get_current_tick() - (self.GAP_MS * 2000)
+        print(f"Initialized GPIO UART on pin {self.data_pin} (notification pipe {self.notify.handle}).", flush=True)
+
+    def init_bb_serial(self, baud=38400, fallback=True):
+        """
+        Let pigpiod do the bit-banging: bb_serial_read_open with BB_BITS data bits returns
+        each 8E2 frame as one 2-byte word, so Python only sees bytes. pigpiod doesn't check
+        stop bits itself; reading them as data bits 9 and 10 lets bb_words do it.
+        With fallback, the raw notification reports for each burst are kept as bytes and
+        only decoded (with the software decoder) when the words fail the framing check.
+        """
+        self.connect()
+
+        self.pi.bb_serial_read_open(self.data_pin, baud, self.BB_BITS)
+        self.bb_serial = True
+        self.bb_baud = baud
+        if fallback:
+            self.notify = NotifyCapture(self.pi, [self.data_pin])
+            self.notify.start()
+        print(f"Initialized bit-bang serial on pin {self.data_pin} at {baud} baud ({self.BB_BITS} data bits).", flush=True)
+
+    def close_bb_serial(self):
+        if self.bb_serial:
+            self.pi.bb_serial_read_close(self.data_pin)
+            self.bb_serial = False
+
+    def bb_words(self, data):
+        """
+        Turn bb_serial_read bytes (BB_BITS words) into 9-bit values.
+        Returns (values, ok); ok is False on an odd byte count or a word whose stop bits
+        aren't both 1 (framing error: a missed start edge or noise on the line).
+        """
+        usable = len(data) & ~1
+        words = array('H')
+        words.frombytes(bytes(data[:usable]))
+        if sys.byteorder != 'little':
+            words.byteswap()
+        stop = self.BB_STOP
+        ok = usable == len(data) and all(w & stop == stop for w in words)
+        return [w & 0x1FF for w in words], ok
+
+    def poll_bb(self):
+        """
+        Collect bit-bang serial bytes; once the line has been quiet for GAP_MS,
+        return the burst as a list of 9-bit values (None while a burst is still open).
+        bb_serial_read data carries no ticks, so the gap is timed by wall clock from the
+        call that saw the last bytes: call this every BB_POLL_S, and bursts that arrive
+        less than GAP_MS + BB_POLL_S apart come back as one.
+        """
+        now = time.monotonic()
+        count, data = self.pi.bb_serial_read(self.data_pin)
+        if self.notify:
+            self.bb_raw.extend(self.notify.read())
+        if count > 0:
+            self.bb_buf.extend(data)
+            self.bb_last_rx = now
+            return None
+        if not self.bb_buf:
+            # Reports may run ahead of the first word; only drop them if they pile up with no words
+            if len(self.bb_raw) > self.RING_SIZE * NotifyCapture.REPORT.size:
+                self.notify.skip(self.bb_raw)
+                self.bb_raw.clear()
+            return None
+        if now - self.bb_last_rx < self.GAP_MS / 1000.0:
+            return None
+
+        values, ok = self.bb_words(self.bb_buf)
+        if self.notify:
+            data = self.notify.read()
+            while data:
+                self.bb_raw.extend(data)
+                data = self.notify.read()
+            if ok:
+                self.notify.skip(self.bb_raw)
+            else:
+                self.bb_framing_errors += 1
+                METRICS.count("bb_framing_errors")
+                print(f"Bit-bang framing error ({len(self.bb_buf)} bytes), using software decoder", flush=True)
+                values = self.decode_reports(self.bb_raw)
+        self.bb_buf.clear()
+        self.bb_raw.clear()
+        self.bb_last_rx = None
+        return values
+
+    def decode_reports(self, raw):
+        """Software decode of a burst of raw notification reports (the bit-bang fallback)."""
+        levels = array('B')
+        ticks = array('I')
+
+        def add(gpio, level, tick):
+            levels.append(level)
+            ticks.append(tick)
+
+        self.notify.feed(raw, add)
+        if not ticks:
+            return []
+        # Close the last bit duration, as main.py does with its virtual transition
+        levels.append(levels[-1])
+        ticks.append((ticks[-1] + self.GAP_MS * 1000) & 0xFFFFFFFF)
+        values = []
+        durations = self.analyze_transitions(levels, ticks)
+        for stream in self.split_durations_by_long_idle(durations, baud=self.bb_baud, threshold_bits=20):
+            values.extend(self.decode_uart(self.decode_edges(stream, baud=self.bb_baud), 8, 1, 2))
+        return values
+
     def decode_uart(self, bits, nbits=8, nparity=1, nstop=2):
         frame_len = 1 + nbits + nparity + nstop # 12
         values = []
@@ -75,20 +286,21 @@ class GpioUart:
                 
                 values.append(val)
             else:
+                METRICS.count("framing_errors")
                 print(f"Framing error at index {i}", flush=True)
 
         return values
 
-    def analyze_transitions(self, snapshot):
-        if len(snapshot) < 2:
+    def analyze_transitions(self, levels, ticks):
+        """(level, duration_us) pairs from parallel level/tick sequences (a snapshot)."""
+        if len(ticks) < 2:
             print("No transitions captured.", flush=True)
             return []
         
         durations = []
-        for i in range(len(snapshot) - 1):
-            level = snapshot[i][0]
-            duration = pigpio.tickDiff(snapshot[i][1], snapshot[i+1][1])
-            durations.append((level, duration))
+        for i in range(len(ticks) - 1):
+            duration = pigpio.tickDiff(ticks[i], ticks[i+1])
+            durations.append((levels[i], duration))
         return durations
 
     def decode_bitstream(self, durations, baud=38400):
@@ -144,7 +356,145 @@ class GpioUart:
                 
         return bits
 
+    def decode_edges(self, durations, baud=38400):
+        """
+        Edge-driven version of decode_bitstream.
+        Instead of stepping 1 us at a time while hunting for a start bit, it jumps
+        straight to the next transition, so the cost follows the number of edges
+        rather than the length of the capture. Output is bit-for-bit identical to
+        decode_bitstream (same sample points, same sticky read pointer).
+        """
+        BIT_US = 1000000.0 / baud
+        SAMPLE_OFFSET = BIT_US * 0.70
+
+        times = []
+        levels = []
+        t_abs = 0
+        for level, dur in durations:
+            times.append(t_abs)
+            levels.append(level)
+            t_abs += dur
+
+        bits = []
+        t = 0
+        ptr = 0
+        n = len(times)
+
+        def get_level_fast(target_t):
+            nonlocal ptr
+            ptr = max(ptr, bisect_right(times, target_t, ptr) - 1)
+            return levels[ptr]
+
+        if durations and durations[0][0] == 0:
+            start_edge = 0
+            for i in range(12):
+                bits.append(get_level_fast(start_edge + (i * BIT_US) + SAMPLE_OFFSET))
+            t = start_edge + (BIT_US * 11)
+
+        limit = t_abs - (BIT_US * 12)
+        mid_sample = 0.65
+        while t < limit:
+            if get_level_fast(t) == 1 and get_level_fast(t + 1) == 0:
+                start_edge = t + 1
+                for i in range(12):
+                    t1 = start_edge + (i * BIT_US) + (BIT_US * (mid_sample - 0.05))
+                    t2 = start_edge + (i * BIT_US) + (BIT_US * mid_sample)
+                    t3 = start_edge + (i * BIT_US) + (BIT_US * (mid_sample + 0.05))
+                    v1 = get_level_fast(t1)
+                    v2 = get_level_fast(t2)
+                    v3 = get_level_fast(t3)
+                    bits.append(1 if (v1 + v2 + v3) >= 2 else 0)
+                t = start_edge + (BIT_US * 11.2)
+            else:
+                # Nothing changes until t + 1 reaches the next edge; skip to just before it.
+                if ptr + 1 >= n:
+                    break
+                skip = math.floor(times[ptr + 1] - t) - 2
+                t = hunt_advance(t, skip) if skip > 0 else t + 1
+
+        return bits
+
+    PLL_PHASE_GAIN = 0.5    # share of an edge's timing error taken into the bit phase
+    PLL_FREQ_GAIN = 0.01    # share of the per-bit error taken into the period, once locked
+    PLL_PRIOR = 50          # weight of the nominal period while acquiring, in bit numbers squared
+    PLL_MAX_PULL = 0.15     # the period stays within this of the nominal one
+    PLL_MID_SAMPLE = 0.6    # sample point within each bit of the tracked clock
+
+    def decode_pll(self, durations, baud=38400, frame_len=12):
+        """
+        Clock-recovery decoder: same bits-out contract as decode_edges, but instead of
+        sampling 12 bits at fixed offsets from the start edge it runs a small digital PLL.
+        Every edge inside a frame is matched to the nearest bit boundary it can be (not past
+        the bit being sampled, not inside the stop bits); the timing error pulls the bit
+        phase (PLL_PHASE_GAIN) and, divided by the bit number, the period.
+        The period carries over from frame to frame: while acquiring it is a least-squares
+        fit of the edges (weight: bit number squared) against the nominal period, worth
+        PLL_PRIOR; after that it follows drift with PLL_FREQ_GAIN. Bits are sampled at
+        PLL_MID_SAMPLE of each bit of the tracked clock. Long runs without edges (0x000 words)
+        are only as good as the starting period, so pass a measured baud where there is one.
+        The line reads idle (1) past the end of the durations, so a final frame whose stop
+        bits the splitter cut off still decodes. self.pll_bit_us keeps the last period.
+        """
+        nominal = 1000000.0 / baud
+        bit_us = nominal
+        low = nominal * (1 - self.PLL_MAX_PULL)
+        high = nominal * (1 + self.PLL_MAX_PULL)
+        phase_gain = self.PLL_PHASE_GAIN
+        freq_gain = self.PLL_FREQ_GAIN
+        mid = self.PLL_MID_SAMPLE
+
+        times = []
+        levels = []
+        t_abs = 0
+        for level, dur in durations:
+            times.append(t_abs)
+            levels.append(level)
+            t_abs += dur
+        n = len(times)
+
+        def level_at(t):
+            if t >= t_abs:
+                return 1
+            return levels[bisect_right(times, t) - 1] if t >= 0 else 1
 
+        bits = []
+        weight = self.PLL_PRIOR
+        i = 0
+        while i < n:
+            # Hunt: next 1 -> 0 transition (a stream may open on the start bit itself)
+            if levels[i] != 0 or (i and levels[i - 1] == 0):
+                i += 1
+                continue
+            ref = times[i]      # tracked time of the start bit's leading edge
+            j = i + 1
+            for b in range(frame_len):
+                sample_t = ref + (b + mid) * bit_us
+                # Re-sync on the edges before this sample point
+                while j < n and times[j] < sample_t:
+                    # An edge seen before bit b's sample point starts bit b at the latest,
+                    # and none falls inside the stop bits
+                    k = min(round((times[j] - ref) / bit_us), b, frame_len - 2)
+                    if k > 0:
+                        error = times[j] - (ref + k * bit_us)
+                        ref += phase_gain * error
+                        # Least squares of the per-bit error (weight k*k) against the
+                        # nominal period's prior while acquiring, then freq_gain
+                        weight += k * k
+                        gain = max(freq_gain, k * k / weight)
+                        bit_us = min(high, max(low, bit_us + gain * error / k))
+                        sample_t = ref + (b + mid) * bit_us
+                    j += 1
+                v1 = level_at(sample_t - 0.1 * bit_us)
+                v2 = level_at(sample_t)
+                v3 = level_at(sample_t + 0.1 * bit_us)
+                bits.append(1 if (v1 + v2 + v3) >= 2 else 0)
+            # The next start bit can't begin before the last stop bit's midpoint
+            hunt = ref + (frame_len - 1 + mid) * bit_us
+            while j < n and times[j] < hunt:
+                j += 1
+            i = j
+        self.pll_bit_us = bit_us
+        return bits
 
     def split_durations_by_long_idle(self, durations, baud=38400, threshold_bits=32):
         """
@@ -152,7 +502,7 @@ class GpioUart:
         Returns a list of duration-lists (each a list of (level, duration)).
         threshold_bits: number of bits (at baud rate) to consider a 'long' duration (default: 32 bits)
         """
-        BIT_US = int(1_000_000 / baud)
+        BIT_US = 1_000_000 / baud
         threshold_us = threshold_bits * BIT_US
         streams = []
         current = []
@@ -215,3 +565,149 @@ class GpioUart:
                 curr_t += 2 # Move in 2us increments to find the edge
                 
         return decoded_bytes
+
+
+class GpioUartStream:
+    """
+    Incremental UART decoder: feed(levels, ticks) with edges as they arrive and get
+    back each word as soon as its last stop-bit sample is covered by a later edge.
+    Partial frame state is kept between calls. End of burst is a separate event:
+    end_burst(now_tick) decodes what the idle line completes and resets.
+    Sample points match decode_edges (3-point vote at 60/65/70% of each bit), measured
+    from the falling edge itself instead of the 1 us hunt grid; as in decode_edges, the
+    hunt for the next start bit resumes 11.2 bits after the start edge.
+    With auto_baud, each burst holds back its first LOCK_EDGES edges (about four frames),
+    measures the bit period from them (baud_estimate.py) and decodes at that period; once
+    ESTIMATE_EDGES edges are in, the period is measured again for the rest of the burst.
+    """
+    LOCK_EDGES = 32     # edges held back before the first words of an auto_baud burst
+
+    def __init__(self, baud=38400, nbits=8, nparity=1, nstop=2, auto_baud=False):
+        self.baud = baud
+        self.auto_baud = auto_baud
+        self.nbits = nbits
+        self.nparity = nparity
+        self.frame_len = 1 + nbits + nparity + nstop # 12
+        self.framing_errors = 0
+        self.reset()
+
+    def reset(self):
+        self.BIT_US = 1000000.0 / self.baud
+        self.estimate = None    # BaudEstimate of the current burst (auto_baud)
+        self.locked = not self.auto_baud
+        self.refined = not self.auto_baud
+        self.times = []         # edge times in us since the first edge of the burst
+        self.levels = []
+        self.first_tick = None
+        self.last_tick = 0
+        self.t_last = 0
+        self.pos = 0            # next edge to look at when hunting for a start bit
+        self.start = None       # start edge of the frame being assembled
+        self.next_hunt = -1     # falling edges at or before this time can't start a frame
+
+    def feed(self, levels, ticks):
+        """Add edges (parallel level/tick sequences); returns the words whose frames are now complete."""
+        times = self.times
+        stored = self.levels
+        for level, tick in zip(levels, ticks):
+            if self.first_tick is None:
+                self.first_tick = tick
+            else:
+                self.t_last += pigpio.tickDiff(self.last_tick, tick)
+            self.last_tick = tick
+            times.append(self.t_last)
+            stored.append(level)
+        if not self.locked:
+            if len(times) <= self.LOCK_EDGES:
+                return []
+            self.lock()
+        elif not self.refined and len(times) > ESTIMATE_EDGES:
+            self.lock()
+            self.refined = True
+        return self.decode(self.t_last)
+
+    def lock(self):
+        """
+        Measure the bit period from the first ESTIMATE_EDGES edges so far; the current one
+        stays if that fails or lands over MAX_PPM from baud. Words already returned keep the
+        period they were decoded at.
+        """
+        times = self.times[:ESTIMATE_EDGES + 1]
+        durations = [(self.levels[i], times[i + 1] - times[i]) for i in range(len(times) - 1)]
+        estimate = estimate_bit_period(durations, expected=self.baud)
+        if estimate:
+            self.estimate = estimate
+            self.BIT_US = estimate.bit_us
+        else:
+            METRICS.count("baud_fallbacks")
+        self.locked = True
+
+    def end_burst(self, now_tick=None):
+        """The line went idle: finish the frames the idle level completes, then reset."""
+        horizon = float('inf')
+        if now_tick is not None and self.first_tick is not None:
+            horizon = self.t_last + pigpio.tickDiff(self.last_tick, now_tick)
+        if not self.locked:
+            self.lock()
+        values = self.decode(horizon)
+        self.reset()
+        return values
+
+    def level_at(self, t):
+        i = bisect_right(self.times, t) - 1
+        return self.levels[i] if i >= 0 else 1   # idle high before the first edge
+
+    def decode(self, horizon):
+        BIT_US = self.BIT_US
+        times = self.times
+        levels = self.levels
+        values = []
+        while True:
+            if self.start is None:
+                # Hunt: next 1 -> 0 transition after the previous frame
+                n = len(times)
+                i = max(self.pos, bisect_right(times, self.next_hunt))
+                while i < n and not (levels[i] == 0 and (i == 0 or levels[i - 1] == 1)):
+                    i += 1
+                self.pos = i
+                if i == n:
+                    break
+                self.start = times[i]
+
+            start_edge = self.start
+            last_sample = start_edge + ((self.frame_len - 1) * BIT_US) + (BIT_US * 0.70)
+            if last_sample >= horizon:
+                break   # stop bits not sampled yet
+
+            bits = []
+            for i in range(self.frame_len):
+                v1 = self.level_at(start_edge + (i * BIT_US) + (BIT_US * 0.60))
+                v2 = self.level_at(start_edge + (i * BIT_US) + (BIT_US * 0.65))
+                v3 = self.level_at(start_edge + (i * BIT_US) + (BIT_US * 0.70))
+                bits.append(1 if (v1 + v2 + v3) >= 2 else 0)
+
+            if bits[0] == 0:
+                val = 0
+                for shift in range(self.nbits):
+                    if bits[shift + 1]:
+                        val |= (1 << shift)
+                if self.nparity > 0 and bits[1 + self.nbits]:
+                    val |= (1 << self.nbits) # Bit 8 (0x100)
+                values.append(val)
+            else:
+                self.framing_errors += 1
+                METRICS.count("framing_errors")
+                print(f"Framing error at {start_edge:.1f} us", flush=True)
+
+            self.next_hunt = start_edge + (BIT_US * 11.2)
+            self.start = None
+            self.trim()
+        return values
+
+    def trim(self):
+        """Drop decoded edges, keeping the one that sets the current level."""
+        keep = bisect_right(self.times, self.next_hunt) - 1
+        if keep > 1024:
+            del self.times[:keep]
+            del self.levels[:keep]
+            self.pos = max(0, self.pos - keep)
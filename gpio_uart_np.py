@@ -0,0 +1,176 @@
+import math
+from bisect import bisect_right
+
+import numpy as np
+
+from baud_estimate import ESTIMATE_EDGES, estimate_bit_period
+from gpio_uart import hunt_advance
+
+# NumPy backend for the GpioUart decode pipeline.
+# Works on int arrays of levels and ticks instead of lists of tuples, for replaying
+# long captures offline. Importing this module is the opt-in; gpio_uart.py itself
+# does not need numpy.
+
+TICK_MASK = 0xFFFFFFFF
+MID_SAMPLE = 0.65
+
+
+def snapshot_arrays(snapshot):
+    """Convert a [(level, tick), ...] snapshot into (levels, ticks) int arrays."""
+    if not snapshot:
+        return np.zeros(0, dtype=np.int8), np.zeros(0, dtype=np.int64)
+    levels, ticks = zip(*snapshot)
+    return np.array(levels, dtype=np.int8), np.array(ticks, dtype=np.int64)
+
+
+def analyze_transitions(levels, ticks):
+    """
+    Array version of GpioUart.analyze_transitions.
+    Returns (levels, durations); durations use the same 32-bit wraparound as pigpio.tickDiff.
+    """
+    if len(ticks) < 2:
+        print("No transitions captured.", flush=True)
+        return levels[:0], np.zeros(0, dtype=np.int64)
+    durations = np.diff(np.asarray(ticks, dtype=np.int64)) & TICK_MASK
+    return np.asarray(levels[:-1], dtype=np.int8), durations
+
+
+def split_durations_by_long_idle(levels, durations, baud=38400, threshold_bits=32):
+    """
+    Array version of GpioUart.split_durations_by_long_idle.
+    Returns a list of (levels, durations) array pairs; the long idle durations are dropped.
+    """
+    BIT_US = 1_000_000 / baud
+    threshold_us = threshold_bits * BIT_US
+    cuts = np.flatnonzero(durations >= threshold_us)
+    streams = []
+    start = 0
+    for cut in cuts.tolist() + [len(durations)]:
+        if cut > start:
+            streams.append((levels[start:cut], durations[start:cut]))
+        start = cut + 1
+    return streams
+
+
+def find_frame_starts(levels, times, t_abs, BIT_US):
+    """
+    Walk the falling edges and pick the start edge of each frame, using the same
+    1 us hunt grid and sticky read pointer as GpioUart.decode_edges.
+    Only this chain is sequential; it costs O(frames), not O(microseconds).
+    """
+    levels_l = levels.tolist()
+    times_l = times.tolist()
+    falling = (np.flatnonzero((levels[1:] == 0) & (levels[:-1] == 1)) + 1).tolist()
+    fall_t = [times_l[j] for j in falling]
+
+    ptr = 0
+
+    def get_level_fast(target_t):
+        nonlocal ptr
+        ptr = max(ptr, bisect_right(times_l, target_t, ptr) - 1)
+        return levels_l[ptr]
+
+    starts = []
+    t0 = 0
+    s_last = -1
+    if levels_l and levels_l[0] == 0:
+        get_level_fast((11 * BIT_US) + BIT_US * 0.70)
+        t0 = BIT_US * 11
+        s_last = 11 * BIT_US + BIT_US * 0.70
+
+    limit = t_abs - (BIT_US * 12)
+    pos = bisect_right(fall_t, max(t0, s_last))
+    while pos < len(fall_t):
+        # First point of the 1 us hunt grid at or past the edge, rounded the way the hunt rounds
+        edge = fall_t[pos]
+        steps = max(1, math.ceil(edge - t0))
+        start = hunt_advance(t0, steps)
+        if start < edge:
+            start += 1
+        elif steps > 1 and hunt_advance(t0, steps - 1) >= edge:
+            start = hunt_advance(t0, steps - 1)
+        if not start - 1 < limit:
+            break
+        if get_level_fast(start - 1) == 1 and get_level_fast(start) == 0:
+            starts.append(start)
+            s_last = start + (11 * BIT_US) + (BIT_US * (MID_SAMPLE + 0.05))
+            get_level_fast(s_last)
+            t0 = start + (BIT_US * 11.2)
+            pos = bisect_right(fall_t, max(t0, s_last), pos + 1)
+        else:
+            pos += 1
+    return starts
+
+
+def decode_bitstream(levels, durations, baud=38400):
+    """
+    Array version of GpioUart.decode_bitstream / decode_edges.
+    Every sample instant is located with one searchsorted call and the 3-point
+    majority vote is done on the whole (frames, 12, 3) block at once.
+    Returns a uint8 array of bits.
+    """
+    BIT_US = 1000000.0 / baud
+    SAMPLE_OFFSET = BIT_US * 0.70
+    levels = np.asarray(levels, dtype=np.int8)
+    durations = np.asarray(durations, dtype=np.int64)
+    if len(durations) == 0:
+        return np.zeros(0, dtype=np.uint8)
+
+    times = np.zeros(len(durations), dtype=np.int64)
+    np.cumsum(durations[:-1], out=times[1:])
+    t_abs = int(times[-1] + durations[-1])
+
+    bit_offsets = np.arange(12) * BIT_US
+    parts = []
+    if levels[0] == 0:
+        first = bit_offsets + SAMPLE_OFFSET
+        parts.append(levels[np.searchsorted(times, first, side="right") - 1].astype(np.uint8))
+
+    starts = find_frame_starts(levels, times, t_abs, BIT_US)
+    if starts:
+        votes = BIT_US * np.array([MID_SAMPLE - 0.05, MID_SAMPLE, MID_SAMPLE + 0.05])
+        samples = (np.array(starts)[:, None, None] + bit_offsets[None, :, None]) + votes[None, None, :]
+        idx = np.searchsorted(times, samples.ravel(), side="right") - 1
+        sampled = levels[idx].reshape(samples.shape)
+        parts.append((sampled.sum(axis=2) >= 2).astype(np.uint8).ravel())
+
+    if not parts:
+        return np.zeros(0, dtype=np.uint8)
+    return np.concatenate(parts)
+
+
+def decode_uart(bits, nbits=8, nparity=1, nstop=2):
+    """
+    Array version of GpioUart.decode_uart.
+    Reshapes the bits into frames and builds the 9-bit words with shifts.
+    """
+    frame_len = 1 + nbits + nparity + nstop # 12
+    nframes = len(bits) // frame_len
+    frames = np.asarray(bits[:nframes * frame_len], dtype=np.uint16).reshape(nframes, frame_len)
+
+    values = (frames[:, 1:1 + nbits] << np.arange(nbits, dtype=np.uint16)).sum(axis=1, dtype=np.uint16)
+    if nparity > 0:
+        values |= frames[:, 1 + nbits] << nbits # Bit 8 (0x100)
+
+    ok = frames[:, 0] == 0
+    for i in np.flatnonzero(~ok).tolist():
+        print(f"Framing error at index {i * frame_len}", flush=True)
+    return values[ok]
+
+
+def decode_snapshot(levels, ticks, baud=38400, threshold_bits=20):
+    """
+    Run the whole main.py pipeline on one snapshot.
+    Returns a list of (bits, values) array pairs, one per stream.
+    baud=None measures the bit period from the snapshot (38400 if that fails or is over MAX_PPM off).
+    """
+    levels, durations = analyze_transitions(levels, ticks)
+    if baud is None:
+        sample = zip(levels[:ESTIMATE_EDGES].tolist(), durations[:ESTIMATE_EDGES].tolist())
+        estimate = estimate_bit_period(list(sample), expected=38400)
+        baud = estimate.baud if estimate else 38400
+    results = []
+    for stream_levels, stream_durations in split_durations_by_long_idle(levels, durations, baud, threshold_bits):
+        bits = decode_bitstream(stream_levels, stream_durations, baud)
+        results.append((bits, decode_uart(bits, 8, 1, 2)))
+    return results
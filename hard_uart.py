@@ -1,9 +1,22 @@
 from typing import Optional
+import os
+import math
+import queue
+import select
 import serial
+import termios
+import threading
 import time
+from hexdump import frame_rows
+from metrics import METRICS
 
 class HardUart:
     SER_TIMEOUT = 0.001 # 0.001 # Non-blocking read
+    RX_BUF_SIZE = 1 << 16   # receive buffer; frames are handed out as views into it
+    READ_CHUNK = 512        # max bytes per read
+    READER_WAIT = 0.1       # reader thread: idle wait before re-checking for stop
+    VMIN = 255              # kernel gap mode: max bytes per read (termios limit)
+    KERNEL_GAP_MIN = 0.1    # kernel gap mode: smallest gap_sec VTIME can express (it counts 0.1 s)
 
     def __init__(self, port, baud, gap_sec):
         self.name = "TX_AVR"
@@ -13,86 +26,248 @@ class HardUart:
         self.bytesize = serial.EIGHTBITS  # Add data bits config
         self.parity = serial.PARITY_MARK
         self.stopbits = serial.STOPBITS_ONE
+        self.ser = None
+        # Bytes are read straight into rx; rx[rx_start:rx_end] is the open burst and
+        # completed frames are memoryview slices of rx (see take_frame)
+        self.rx = bytearray(self.RX_BUF_SIZE)
+        self.rx_view = memoryview(self.rx)
+        self.rx_start = 0
+        self.rx_end = 0
+        self.last_rx = None
+        self.last_rx_ns = None
+        self.last_frame = None
+        # Reader thread mode (start_reader): completed frames are queued here
+        self.frames = None
+        self.reader = None
+        self.reader_stop = threading.Event()
+        self.saved_termios = None
+        if self.port is None:
+            # Offline (replaying a capture log): frames come from report_frame only
+            return
         self.ser = serial.Serial(self.port, self.baud, timeout=self.SER_TIMEOUT,
                                  bytesize=self.bytesize, parity=self.parity,
                                  stopbits=self.stopbits)
-        self.buf = bytearray()
-        self.last_rx = None
-        self.last_frame = None
         print(f"Listening to {self.name} on {self.port} at {self.baud} baud (gap_sec={self.gap_sec}, {self.bytesize}{self.parity}{self.stopbits})...", flush=True)
 
     def read_bytes(self):
-        """Read data from the serial port and update the buffer."""
+        """Read what the serial port has buffered into the receive buffer; returns the byte count."""
         # print(f"Reading from {self.port}...", flush=True)
-        data = self.ser.read(512)
-        if data:
-            self.buf.extend(data)
-            self.last_rx = time.monotonic()
+        if len(self.rx) - self.rx_end < self.READ_CHUNK:
+            self.make_room()
+        n = self.recv_into(self.rx_view[self.rx_end:self.rx_end + self.READ_CHUNK])
+        if n:
+            self.rx_end += n
+            self.last_rx_ns = time.monotonic_ns()
+            self.last_rx = self.last_rx_ns / 1e9
+        return n
+
+    def recv_into(self, view):
+        """Read into view without waiting. On POSIX the kernel copies straight into it."""
+        fd = getattr(self.ser, 'fd', None)
+        if fd is not None:
+            try:
+                return os.readv(fd, [view])
+            except BlockingIOError:
+                return 0
+        waiting = self.ser.in_waiting
+        return self.ser.readinto(view[:waiting]) if waiting else 0
+
+    def make_room(self):
+        """
+        Continue in a fresh buffer, carrying over the open burst. rx is never rewritten
+        in place, so frame views handed out earlier stay valid (they keep the old buffer alive).
+        """
+        pending = self.rx_end - self.rx_start
+        rx = bytearray(max(self.RX_BUF_SIZE, 2 * (pending + self.READ_CHUNK)))
+        rx[:pending] = self.rx_view[self.rx_start:self.rx_end]
+        self.rx = rx
+        self.rx_view = memoryview(rx)
+        self.rx_start = 0
+        self.rx_end = pending
+
+    def pending(self):
+        return self.rx_end - self.rx_start
+
+    def take_frame(self):
+        """Close the open burst and return it as a memoryview into the receive buffer."""
+        frame = self.rx_view[self.rx_start:self.rx_end]
+        self.rx_start = self.rx_end
+        self.last_rx = None
+        self.last_rx_ns = None
+        return frame
 
     def process_burst(self):
-        """Check for a gap and process the buffered frame if one is found."""
+        """
+        Check for a gap and process the buffered frame if one is found.
+        Returns (frame, now, delta) for the completed frame, or None.
+        frame is a memoryview into the receive buffer (no copy is made).
+        """
         now = time.monotonic()
         delta = (now - self.last_rx) if self.last_rx else None
-        if self.buf and self.last_rx and delta >= self.gap_sec:
-            frame = bytes(self.buf)
-            print(f"--- {self.name}: [{now*1000:.3f}ms ({delta*1000:.3f})ms] NEW FRAME (UART burst len={len(frame)}) ---", flush=True)
-            if self.last_frame and len(frame) == len(self.last_frame):
-                xor_frame = bytes(a ^ b for a, b in zip(frame, self.last_frame))
-                self.print_frame(frame, xor_frame)
+        if self.pending() and self.last_rx and delta >= self.gap_sec:
+            frame = self.take_frame()
+            self.report_frame(frame, now, delta)
+            return frame, now, delta
+        return None
+
+    def wait_readable(self, timeout):
+        """Block until the port has data or timeout seconds pass; True if data is waiting."""
+        fd = getattr(self.ser, 'fd', None)
+        if fd is not None:
+            return bool(select.select([fd], [], [], timeout)[0])
+        deadline = time.monotonic() + timeout
+        while not self.ser.in_waiting:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def start_reader(self, kernel_gap=False):
+        """
+        Read the port on a dedicated thread instead of polling read_bytes/process_burst.
+        The thread blocks until data arrives, stamps every chunk with time.monotonic_ns()
+        and closes the frame once gap_sec passes without a byte. Completed frames are
+        queued on self.frames as (frame, now, delta); collect them with get_frames().
+        With kernel_gap the tty driver finds the gap instead (see kernel_gap_loop); below
+        KERNEL_GAP_MIN it can't find the same gaps, so the plain reader thread is used.
+        """
+        target = self.reader_loop
+        if kernel_gap and self.gap_sec < self.KERNEL_GAP_MIN:
+            print(f"{self.name}: gap_sec={self.gap_sec} is below the {self.KERNEL_GAP_MIN} s VTIME resolution, "
+                  f"using the reader thread's gap detection instead", flush=True)
+        elif kernel_gap:
+            self.init_kernel_gap()
+            target = self.kernel_gap_loop
+        self.frames = queue.Queue()
+        self.reader_stop.clear()
+        self.reader = threading.Thread(target=target, name=f"{self.name}-reader", daemon=True)
+        self.reader.start()
+
+    def stop_reader(self):
+        if self.reader:
+            self.reader_stop.set()
+            self.reader.join()
+            self.reader = None
+        if self.saved_termios:
+            fd = self.ser.fd
+            termios.tcsetattr(fd, termios.TCSANOW, self.saved_termios)
+            os.set_blocking(fd, False)
+            self.saved_termios = None
+
+    def init_kernel_gap(self):
+        """
+        Switch the tty to blocking reads with VMIN=VMIN and VTIME=gap_sec, so a read returns
+        when the line has been quiet for VTIME or VMIN bytes are in. VTIME counts tenths of
+        a second: gap_sec must be at least KERNEL_GAP_MIN, and is rounded up to 0.1 s.
+        """
+        fd = getattr(self.ser, 'fd', None)
+        if fd is None:
+            raise ValueError("kernel gap mode needs a POSIX tty")
+        if self.gap_sec < self.KERNEL_GAP_MIN:
+            raise ValueError(f"kernel gap mode needs gap_sec >= {self.KERNEL_GAP_MIN} (VTIME counts tenths of a second)")
+        self.vtime = min(255, math.ceil(self.gap_sec * 10))
+        self.saved_termios = termios.tcgetattr(fd)
+        attrs = termios.tcgetattr(fd)
+        attrs[6][termios.VMIN] = self.VMIN
+        attrs[6][termios.VTIME] = self.vtime
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        os.set_blocking(fd, True)
+        print(f"{self.name}: kernel gap detection, VMIN={self.VMIN} VTIME={self.vtime} ({self.vtime * 100} ms)", flush=True)
+
+    def reader_loop(self):
+        while not self.reader_stop.is_set():
+            # Inside a burst, waiting gap_sec for the next byte is the inter-byte timeout
+            if self.wait_readable(self.gap_sec if self.pending() else self.READER_WAIT):
+                self.read_bytes()
+            elif self.pending():
+                now_ns = time.monotonic_ns()
+                delta_ns = now_ns - self.last_rx_ns
+                self.frames.put((self.take_frame(), now_ns / 1e9, delta_ns / 1e9))
+
+    def kernel_gap_loop(self):
+        """
+        Reader thread for kernel_gap: blocking reads of up to VMIN bytes. The driver returns
+        once VTIME passes after a byte, so the frame's last byte arrived about VTIME before
+        the read returned. A read that fills VMIN, or leaves input queued, is part of a
+        longer frame: reading continues and the pieces are joined, so frames over VMIN
+        bytes (or handed over in driver-sized pieces) take several reads.
+        """
+        fd = self.ser.fd
+        vtime_ns = self.vtime * 100000000
+        while not self.reader_stop.is_set():
+            # Only start the blocking read once data is there, so stop_reader() is honoured
+            if not self.wait_readable(self.READER_WAIT):
+                continue
+            if len(self.rx) - self.rx_end < self.VMIN:
+                self.make_room()
+            n = os.readv(fd, [self.rx_view[self.rx_end:self.rx_end + self.VMIN]])
+            now_ns = time.monotonic_ns()
+            self.rx_end += n
+            if n == self.VMIN:
+                self.last_rx_ns = now_ns
+                if self.wait_readable(self.vtime / 10):
+                    continue
+                now_ns = time.monotonic_ns()
+            elif self.wait_readable(0):
+                # Short read with input still queued: the driver hands reads over in
+                # pieces (64 bytes on current Linux), so this was not the gap
+                self.last_rx_ns = now_ns
+                continue
             else:
-                self.print_frame(frame)
-            self.last_frame = frame
-            self.buf.clear()
-            self.last_rx = None
+                self.last_rx_ns = now_ns - vtime_ns
+            if self.pending():
+                delta_ns = now_ns - self.last_rx_ns
+                self.frames.put((self.take_frame(), now_ns / 1e9, delta_ns / 1e9))
+
+    def get_frames(self):
+        """Report and return the frames the reader thread completed since the last call."""
+        completed = []
+        while True:
+            try:
+                frame, now, delta = self.frames.get_nowait()
+            except queue.Empty:
+                return completed
+            self.report_frame(frame, now, delta)
+            completed.append((frame, now, delta))
+
+    def report_frame(self, frame: bytes, now: float, delta: float):
+        """Print a completed frame, with the XOR column when it matches the last frame's length."""
+        t0 = METRICS.now()
+        METRICS.count("uart_frames")
+        METRICS.count("uart_bytes", len(frame))
+        print(f"--- {self.name}: [{now*1000:.3f}ms ({delta*1000:.3f})ms] NEW FRAME (UART burst len={len(frame)}) ---", flush=True)
+        if self.last_frame and len(frame) == len(self.last_frame):
+            # XOR the two frames as big integers instead of byte by byte
+            xor = int.from_bytes(frame, 'little') ^ int.from_bytes(self.last_frame, 'little')
+            self.print_frame(frame, xor.to_bytes(len(frame), 'little'))
+        else:
+            self.print_frame(frame)
+        self.last_frame = frame
+        METRICS.observe("uart_report", t0)
 
     def close(self):
-        self.ser.close()
+        self.stop_reader()
+        if self.ser:
+            self.ser.close()
 
     def print_frame(self, frame: bytes, xor_data: Optional[bytes] = None):
         """
         Prints the frame in a consolidated hexdump format.
         Shows raw hex, raw ascii, extracted MSBs, and stripped ascii.
         Optionally shows a fifth column with custom-formatted XOR data.
+        The rows are rendered into one buffer and written with a single print.
         """
-        for i in range(0, len(frame), 16):
-            chunk = frame[i:i+16]
-            # Address
-            addr = f"{i:08x}"
-            # 1. Raw Hex values
-            hex_part = " ".join(f"{b:02x}" for b in chunk)
-            hex_part = hex_part.ljust(16 * 3 - 1)
-            # 2. Raw ASCII values
-            raw_ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in chunk)
-            raw_ascii_part = raw_ascii_part.ljust(16)
-            # 3. Extracted MSBs
-            msb_part = "".join('1' if b & 0x80 else '.' for b in chunk)
-            msb_part = msb_part.ljust(16)
-            # 4. Stripped ASCII values
-            stripped_chunk = bytes(b & 0x7F for b in chunk)
-            stripped_ascii_part = "".join(chr(b) if 32 <= b <= 126 else "." for b in stripped_chunk)
-            stripped_ascii_part = stripped_ascii_part.ljust(16)
-            line = f"{addr}  {hex_part}  |{raw_ascii_part}| |{msb_part}| |{stripped_ascii_part}|"
-            # 5. Optional XOR data
-            if xor_data:
-                xor_chunk = xor_data[i:i+16]
-                def get_xor_char(b):
-                    if b == 0x80:
-                        return 'X'
-                    if b == 0x00:
-                        return '-'
-                    return chr(b) if 32 <= b <= 126 else "."
-                xor_part = "".join(get_xor_char(b) for b in xor_chunk)
-                xor_part = xor_part.ljust(16)
-                line += f" |{xor_part}|"
-            print(line)
-        
+        lines = frame_rows(frame, xor_data)
+
         # Checksum calculation and comparison
         if len(frame) > 1:
             computed_checksum = sum(frame[:-1]) & 0xFF
             received_checksum = frame[-1]
             diff = (received_checksum - computed_checksum) & 0xFF
             if diff == 0:
-                print(f"Checksum OK: computed 0x{computed_checksum:02X}, received 0x{received_checksum:02X}")
+                lines.append(f"Checksum OK: computed 0x{computed_checksum:02X}, received 0x{received_checksum:02X}")
             else:
-                print(f"Checksum mismatch: computed 0x{computed_checksum:02X}, received 0x{received_checksum:02X}, diff 0x{diff:02X}")
-        print("", flush=True)
+                METRICS.count("checksum_failures")
+                lines.append(f"Checksum mismatch: computed 0x{computed_checksum:02X}, received 0x{received_checksum:02X}, diff 0x{diff:02X}")
+        lines.append("")
+        print("\n".join(lines), flush=True)
@@ -0,0 +1,59 @@
+# Table-driven hexdump rows for HardUart.print_frame and main.print_hex_data.
+# Every column of a frame is rendered in one bulk pass (bytes.hex, bytes.translate or a
+# map over a lookup table) and then sliced into rows, instead of formatting byte by byte.
+
+def _ascii_table(size, mask):
+    return [chr(b & mask) if 32 <= (b & mask) <= 126 else "." for b in range(size)]
+
+# 8-bit frames (HardUart): bytes.translate tables, one output byte per input byte
+RAW_ASCII = "".join(_ascii_table(256, 0xFF)).encode("latin-1")
+STRIPPED_ASCII = "".join(_ascii_table(256, 0x7F)).encode("latin-1")
+MSB = bytes(ord('1') if b & 0x80 else ord('.') for b in range(256))
+XOR = bytes(ord('X') if b == 0x80 else ord('-') if b == 0x00 else RAW_ASCII[b] for b in range(256))
+
+# 9-bit words (GPIO decoder): 512-entry tables indexed by the word value
+HEX3 = [f"{w:03X}" for w in range(512)]
+RAW_ASCII9 = _ascii_table(512, 0xFF)
+MASKED_ASCII9 = _ascii_table(512, 0x7F)
+
+
+def frame_rows(frame, xor_data=None, n=16):
+    """HardUart rows: address, hex, raw ASCII, MSB map, stripped ASCII and the optional XOR column."""
+    frame = bytes(frame)
+    hex_all = frame.hex(' ')
+    raw_all = frame.translate(RAW_ASCII).decode("latin-1")
+    msb_all = frame.translate(MSB).decode("latin-1")
+    stripped_all = frame.translate(STRIPPED_ASCII).decode("latin-1")
+    xor_all = bytes(xor_data).translate(XOR).decode("latin-1") if xor_data else None
+    hex_width = n * 3 - 1
+    lines = []
+    for i in range(0, len(frame), n):
+        count = min(n, len(frame) - i)
+        hex_part = hex_all[i * 3:(i + count) * 3 - 1].ljust(hex_width)
+        line = (f"{i:08x}  {hex_part}  |{raw_all[i:i + n].ljust(n)}| "
+                f"|{msb_all[i:i + n].ljust(n)}| |{stripped_all[i:i + n].ljust(n)}|")
+        if xor_all is not None:
+            line += f" |{xor_all[i:i + n].ljust(n)}|"
+        lines.append(line)
+    return lines
+
+
+def word_rows(values, n=16, base=0):
+    """
+    print_hex_data rows for 9-bit words: address, 3-digit hex, raw ASCII and masked ASCII.
+    base: address of values[0], for rows printed a piece at a time.
+    """
+    if values and max(values) >= 512:
+        # Out of table range (not a 9-bit word): only the ASCII columns can use the tables
+        hex_rows = [" ".join(f"{w:03X}" for w in values[i:i + n]) for i in range(0, len(values), n)]
+        values = [w & 0x1FF for w in values]
+    else:
+        hex_all = " ".join(map(HEX3.__getitem__, values))
+        hex_rows = [hex_all[i * 4:(i + n) * 4 - 1] for i in range(0, len(values), n)]
+    raw_all = "".join(map(RAW_ASCII9.__getitem__, values))
+    masked_all = "".join(map(MASKED_ASCII9.__getitem__, values))
+    hex_width = n * 4
+    lines = []
+    for row, i in enumerate(range(0, len(values), n)):
+        lines.append(f"{base + i:04X}:  {hex_rows[row].ljust(hex_width)} | {raw_all[i:i + n].ljust(n)} | {masked_all[i:i + n]}")
+    return lines
@@ -1,16 +1,43 @@
+import asyncio
 import time
 import serial
 from typing import Dict, Any, Optional
 import pigpio
 from gpio_uart import GpioUart
 from hard_uart import HardUart
+from hexdump import word_rows
+from capture_engine import CaptureEngine
+from capture_log import CaptureLogWriter
+from output_sink import OutputSink
+from metrics import METRICS
+from baud_estimate import estimate_bit_period
+
+UART_PORT = '/dev/ttyAMA5'
+GPIO_MODE = "notify"  # "callback" (pi.callback per edge), "notify" (bulk pipe) or "bb_serial" (pigpiod bit-bang reader)
+ENGINE = "poll"       # "poll" (sleep/poll loop in main()) or "asyncio" (CaptureEngine, timer-driven gaps)
+CAPTURE_LOG = "capture.cap"  # binary capture log (raw transitions, bb_serial words + UART frames); replay with capture_log.py
+UART_READER = "thread"  # poll engine: "thread" (HardUart reader thread) or "poll" (read_bytes/process_burst per
+                        # pass); "termios" lets the tty driver find gaps with VMIN/VTIME, but VTIME counts
+                        # 0.1 s, so it only applies with a gap_sec of 0.1 s or more (frames closer than that
+                        # merge) and falls back to "thread" below it
+METRICS_ENABLED = True   # stage timers and counters (metrics.py); dumped on SIGUSR1 and at exit
+METRICS_FILE = None      # dump target (None: stderr)
+METRICS_INTERVAL = 0     # seconds between periodic dumps (0: off)
+METRICS_HTTP_PORT = None # e.g. 9100 to serve the dump on http://127.0.0.1:9100/
+BAUD = 38400             # nominal RX_AVR/TX_AVR rate
+AUTO_BAUD = False        # measure the RX_AVR bit period of each burst (baud_estimate.py); BAUD if that fails or is over MAX_PPM off
+GPIO_DECODER = "edges"   # "edges" (decode_edges, fixed sample points) or "pll" (decode_pll, clock recovery)
+OUTPUT_POLICY = "block"  # console writer thread when its queue is full: "block" (wait) or "drop" (skip frames)
+STREAM_WORDS = True      # asyncio engine: decode RX_AVR words while the burst arrives (GpioUartStream), print them when it ends
+                         # instead of the bitstream and hexdump once it has ended
 
 def print_bitstream(bits, group_size):
     """
     Print the bitstream in groups, skipping long runs of 1s as '1xN'.
     group_size: number of bits per group (for spacing)
+    The rows are rendered into one buffer and written with a single print.
     """
-    print(f"\nDecoded bits: ({len(bits)} @ {group_size})", flush=True)
+    lines = [f"\nDecoded bits: ({len(bits)} @ {group_size})"]
     ONES_THRESHOLD = 32
     LONG_WORD = group_size * 8
     i = 0
@@ -20,7 +47,7 @@ def print_bitstream(bits, group_size):
             while (i + run < len(bits)) and (bits[i + run] == 1):
                 run += 1
             if run > ONES_THRESHOLD:
-                print(f"1x{run}", flush=True)
+                lines.append(f"1x{run}")
                 i += run
                 continue
         line_bits = bits[i:i+LONG_WORD]
@@ -45,13 +72,15 @@ def print_bitstream(bits, group_size):
             grouped.append(''.join(out[k:k+group_size]))
             k += group_size
         if grouped:
-            print(' '.join(grouped), flush=True)
+            lines.append(' '.join(grouped))
         i += len(out)
+    print("\n".join(lines), flush=True)
 
 def print_hex_data(data_bytes, n=16):
     """
     Prints four columns: 
     Address, Hex, ASCII (raw), and ASCII (masked 0x7F).
+    The rows are rendered into one buffer and written with a single print.
     """
     if not data_bytes:
         return
@@ -59,99 +88,262 @@ def print_hex_data(data_bytes, n=16):
     # Convert to integers
     ints = [int(b, 16) if isinstance(b, str) else b for b in data_bytes]
 
-    # Header
+    lines = hex_data_header(n)
+    lines.extend(word_rows(ints, n))
+    print("\n".join(lines), flush=True)
+
+def hex_data_header(n=16):
     hex_header = "Hex Values".ljust(n * 4)
-    print(f"{'Address':<8} {hex_header} | {'ASCII':<{n}} | {'Masked ASCII'}", flush=True)
-    print("-" * (10 + (n * 4) + (n * 2) + 6), flush=True)
-
-    for i in range(0, len(ints), n):
-        chunk = ints[i : i + n]
-        
-        # 1. Address
-        addr = f"{i:04X}: "
-        
-        # 2. Hex values
-        hex_vals = " ".join(f"{b:03X}" for b in chunk).ljust(n * 4)
-        
-        # 3. Raw ASCII
-        raw_ascii = "".join((chr(b & 0xff) if 32 <= (b & 0xff) <= 126 else ".") for b in chunk).ljust(n)
-        
-        # 4. Masked ASCII (b & 0x7F)
-        masked_ascii = "".join((chr(b & 0x7F) if 32 <= (b & 0x7F) <= 126 else ".") for b in chunk)
-        
-        print(f"{addr} {hex_vals} | {raw_ascii} | {masked_ascii}", flush=True)
+    return [f"{'Address':<8} {hex_header} | {'ASCII':<{n}} | {'Masked ASCII'}",
+            "-" * (10 + (n * 4) + (n * 2) + 6)]
+
+class WordStreamReport:
+    """
+    print_hex_data for the words CaptureEngine streams (STREAM_WORDS): each row is rendered
+    as soon as its n words have been decoded, and the burst is printed as one standard
+    "--- Stream 1: N bytes ---" block when it ends, so frames on other channels can't
+    land in the middle of it.
+    """
+    def __init__(self, n=16):
+        self.n = n
+        self.values = []
+        self.lines = []
+
+    def add(self, values):
+        self.values.extend(values)
+        self.render_rows(len(self.values) - len(self.values) % self.n)
+
+    def render_rows(self, end):
+        done = len(self.lines) * self.n
+        if end > done:
+            self.lines.extend(word_rows(self.values[done:end], self.n, base=done))
+
+    def end(self):
+        """The burst is over: print it and start over."""
+        METRICS.count("gpio_frames")
+        METRICS.count("gpio_words", len(self.values))
+        print(f"\n--- Stream 1: {len(self.values)} bytes ---", flush=True)
+        if self.values:
+            self.render_rows(len(self.values))
+            print("\n".join(hex_data_header(self.n) + self.lines), flush=True)
+        print("--- Transaction Complete ---", flush=True)
+        self.values = []
+        self.lines = []
+
+def report_gpio_snapshot(gpio_uart, levels, ticks):
+    """Decode a closed (levels, ticks) snapshot and print its bits and hexdump."""
+    t0 = METRICS.now()
+    durations = gpio_uart.analyze_transitions(levels, ticks)
+    METRICS.observe("analyze_transitions", t0)
+    METRICS.count("edges_decoded", len(ticks))
+    if durations:
+        baud = BAUD
+        if AUTO_BAUD:
+            t0 = METRICS.now()
+            estimate = estimate_bit_period(durations, expected=BAUD)
+            METRICS.observe("estimate_baud", t0)
+            if estimate:
+                baud = estimate.baud
+                print(f"Bit period: {estimate.bit_us:.3f} us ({estimate.baud:.0f} baud, "
+                      f"{estimate.ppm:+.0f} ppm from {estimate.nominal})", flush=True)
+            else:
+                METRICS.count("baud_fallbacks")
+        # Use a small threshold for internal byte gaps
+        t0 = METRICS.now()
+        streams = gpio_uart.split_durations_by_long_idle(durations, baud=baud, threshold_bits=20)
+        METRICS.observe("split_durations_by_long_idle", t0)
+        for idx, stream in enumerate(streams):
+            t0 = METRICS.now()
+            if GPIO_DECODER == "pll":
+                bits = gpio_uart.decode_pll(stream, baud=baud)
+            else:
+                bits = gpio_uart.decode_edges(stream, baud=baud)
+            METRICS.observe("decode_" + GPIO_DECODER, t0)
+            t0 = METRICS.now()
+            print_bitstream(bits, 12)
+            METRICS.observe("print", t0)
+            t0 = METRICS.now()
+            decoded_bytes = gpio_uart.decode_uart(bits, 8, 1, 2) # 8E2
+            METRICS.observe("decode_uart", t0)
+            METRICS.count("gpio_frames")
+            METRICS.count("gpio_words", len(decoded_bytes))
+            # decoded_bytes = decode_fixed(stream, baud=baud)
+            t0 = METRICS.now()
+            print(f"\n--- Stream {idx+1}: {len(decoded_bytes)} bytes ---", flush=True)
+            print_hex_data(decoded_bytes, 16)
+            METRICS.observe("print", t0)
+    else:
+        print("No durations to analyze.", flush=True)
+    print("--- Transaction Complete ---", flush=True)
+
+def report_gpio_words(values):
+    """Print a burst of words already decoded by pigpiod (GPIO_MODE "bb_serial")."""
+    METRICS.count("gpio_frames")
+    METRICS.count("gpio_words", len(values))
+    print(f"\n--- Stream 1: {len(values)} bytes ---", flush=True)
+    print_hex_data(values, 16)
+    print("--- Transaction Complete ---", flush=True)
+
+def start_metrics():
+    METRICS.enabled = METRICS_ENABLED
+    if not METRICS_ENABLED:
+        return
+    METRICS.install_signal(METRICS_FILE)
+    if METRICS_INTERVAL:
+        METRICS.start_periodic(METRICS_INTERVAL, METRICS_FILE)
+    if METRICS_HTTP_PORT:
+        METRICS.serve_http(METRICS_HTTP_PORT)
+
+def stop_metrics():
+    if METRICS.enabled:
+        METRICS.dump(METRICS_FILE)
+
+def start_capture(gpio_uart):
+    if GPIO_MODE == "bb_serial":
+        gpio_uart.init_bb_serial(baud=BAUD)
+    elif GPIO_MODE == "callback":
+        gpio_uart.init_pigpio()
+    else:
+        gpio_uart.init_notify()
+
+    print("Waiting for signal changes... (Ctrl-C to stop)", flush=True)
+    print("Trigger the Cybiko to send data now.", flush=True)
+
+def stop_capture(gpio_uart):
+    if gpio_uart.callback:
+        gpio_uart.callback.cancel()
+    gpio_uart.close_bb_serial()
+    if gpio_uart.notify:
+        gpio_uart.notify.stop()
+    if gpio_uart.pi and gpio_uart.pi.connected:
+        gpio_uart.pi.stop()
+    print("Cleanup complete. Exiting.", flush=True)
 
 def main():
     gpio_uart = GpioUart(pigpio.pi(), data_pin=9)
-    hard_uart = HardUart(port='/dev/ttyAMA5', baud=38400, gap_sec=0.01)
+    hard_uart = HardUart(port=UART_PORT, baud=BAUD, gap_sec=0.01)
     print(f"Starting Logic Analyzer on GPIO {gpio_uart.DATA_PIN}...", flush=True)
     transitions = []              # Clear the global for the next burst
+    capture_log = CaptureLogWriter(CAPTURE_LOG)
+    # Console output is buffered per loop pass and written by a background thread
+    sink = OutputSink(policy=OUTPUT_POLICY).install()
+    start_metrics()
 
     try:
-        gpio_uart.init_pigpio() 
-
-        print("Waiting for signal changes... (Ctrl-C to stop)", flush=True)
-        print("Trigger the Cybiko to send data now.", flush=True)
+        start_capture(gpio_uart)
+        if UART_READER in ("thread", "termios"):
+            hard_uart.start_reader(kernel_gap=UART_READER == "termios")
 
         while True:
-            hard_uart.read_bytes()  # Read from hardware UART
-            hard_uart.process_burst()  # Process any complete frames
+            if hard_uart.reader:
+                for completed in hard_uart.get_frames():  # Frames closed by the reader thread
+                    capture_log.write_uart(hard_uart.name, *completed)
+            else:
+                hard_uart.read_bytes()  # Read from hardware UART
+                completed = hard_uart.process_burst()  # Process any complete frames
+                if completed:
+                    capture_log.write_uart(hard_uart.name, *completed)
+            if GPIO_MODE == "bb_serial":
+                values = gpio_uart.poll_bb()
+                if values is not None:
+                    capture_log.write_words(gpio_uart.data_pin, values)
+                    report_gpio_words(values)
+            else:
+                t0 = METRICS.now()
+                gpio_uart.poll_edges()  # Drain the edge ring filled by the pigpio callback
+                METRICS.observe("poll_edges", t0)
 
-            if len(gpio_uart.transitions) > 0:
+            if len(gpio_uart.ticks) > 0:
                 now = gpio_uart.pi.get_current_tick()
                 # How long since the last bit?
                 silence_duration = pigpio.tickDiff(gpio_uart.last_event_tick, now)
                 print(f"Silence duration: {silence_duration} us", flush=True)
 
                 if silence_duration > (gpio_uart.GAP_MS * 1000):
-                    # 1. LOCK the thread by copying the data immediately
-                    # Do NOT reset 'capturing' yet, let the callback finish its thought
-                    raw_snapshot = list(gpio_uart.transitions)
-                    gpio_uart.transitions = [] 
-                    gpio_uart.capturing = False # Tell the callback we are ready for a fresh start bit
+                    # Last edge to burst close: how long the gap check held the frame
+                    METRICS.record("gap_wait", silence_duration * 1000)
+                    # 1. Take the captured transitions; only this thread touches them,
+                    # the callback just fills the edge ring
+                    levels, ticks = gpio_uart.take_snapshot()
 
                     # 2. Re-anchor the snapshot with a final virtual transition
                     # This 'closes' the last bit duration so the decoder can see it
-                    if raw_snapshot:
-                        last_level, _ = raw_snapshot[-1]
-                        raw_snapshot.append((last_level, now))
+                    if ticks:
+                        levels.append(levels[-1])
+                        ticks.append(now)
                     else:
                         print("No transitions captured in snapshot.", flush=True)
                         gpio_uart.capturing = False
                         continue
 
-                    # 3. Process the snapshot
-                    durations = gpio_uart.analyze_transitions(raw_snapshot)
-                    if durations:
-                        # Use a small threshold for internal byte gaps
-                        streams = gpio_uart.split_durations_by_long_idle(durations, baud=38400, threshold_bits=20)
-                        for idx, stream in enumerate(streams):
-                            bits = gpio_uart.decode_bitstream(stream, baud=38400)
-                            print_bitstream(bits, 12)
-                            decoded_bytes = gpio_uart.decode_uart(bits, 8, 1, 2) # 8E2
-                            # decoded_bytes = decode_fixed(stream, baud=38400)
-                            print(f"\n--- Stream {idx+1}: {len(decoded_bytes)} bytes ---", flush=True)
-                            print_hex_data(decoded_bytes, 16)
-                    else:
-                        print("No durations to analyze.", flush=True)
-
-                    # 4. Ready for next packet
-                    gpio_uart.capturing = False 
-                    print("--- Transaction Complete ---", flush=True)
+                    # 3. Log and process the snapshot
+                    capture_log.write_gpio(gpio_uart.data_pin, levels, ticks)
+                    report_gpio_snapshot(gpio_uart, levels, ticks)
             else:
                 # print("Idle...", flush=True)
                 pass
 
-            time.sleep(0.01)
+            sink.commit()
+            # The bit-bang reader times its burst gap by wall clock between passes
+            time.sleep(gpio_uart.BB_POLL_S if GPIO_MODE == "bb_serial" else 0.01)
 
     except KeyboardInterrupt:
         print("\nStopping analyzer...", flush=True)
     finally:
-        if gpio_uart.callback:
-            gpio_uart.callback.cancel()
-        if gpio_uart.pi and gpio_uart.pi.connected:
-            gpio_uart.pi.stop()
-        print("Cleanup complete. Exiting.", flush=True)
+        hard_uart.close()
+        capture_log.close()
+        stop_capture(gpio_uart)
+        sink.close()
+        stop_metrics()
+
+async def async_main():
+    """
+    main() driven by CaptureEngine instead of a sleep/poll loop. Each closed burst gets one
+    "Silence duration" line (its gap) where main() prints one per loop pass while it waits.
+    """
+    gpio_uart = GpioUart(pigpio.pi(), data_pin=9)
+    hard_uart = HardUart(port=UART_PORT, baud=BAUD, gap_sec=0.01)
+    print(f"Starting Logic Analyzer on GPIO {gpio_uart.DATA_PIN} (asyncio)...", flush=True)
+    engine = CaptureEngine(hard_uart, gpio_uart, stream_words=STREAM_WORDS, baud=BAUD, auto_baud=AUTO_BAUD)
+    word_report = WordStreamReport()
+    capture_log = CaptureLogWriter(CAPTURE_LOG)
+    sink = OutputSink(policy=OUTPUT_POLICY).install()
+    start_metrics()
+
+    try:
+        start_capture(gpio_uart)
+        sink.commit()
+        engine.start()
+        while True:
+            name, payload, now, delta = await engine.frames.get()
+            if name == hard_uart.name:
+                capture_log.write_uart(name, payload, now, delta)
+                hard_uart.report_frame(payload, now, delta)
+            elif name == "RX_AVR_WORDS":
+                # Words decoded so far in a burst that is still arriving
+                word_report.add(payload)
+            else:
+                capture_log.write_gpio(gpio_uart.data_pin, *payload)
+                print(f"Silence duration: {round(delta * 1000000)} us", flush=True)
+                if engine.stream:
+                    word_report.end()
+                else:
+                    report_gpio_snapshot(gpio_uart, *payload)
+            sink.commit()
+    finally:
+        if engine.loop:
+            engine.stop()
+        hard_uart.close()
+        capture_log.close()
+        stop_capture(gpio_uart)
+        sink.close()
+        stop_metrics()
 
 if __name__ == "__main__":
-    main()
+    if ENGINE == "asyncio":
+        try:
+            asyncio.run(async_main())
+        except KeyboardInterrupt:
+            print("\nStopping analyzer...", flush=True)
+    else:
+        main()
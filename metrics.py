@@ -0,0 +1,163 @@
+import signal
+import sys
+import threading
+import time
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Low-overhead counters and latency histograms for the capture loop.
+#
+#   t0 = METRICS.now()
+#   ... stage ...
+#   METRICS.observe("decode_edges", t0)
+#   METRICS.count("edges", n)
+#
+# Timers are time.monotonic_ns() deltas. Histograms use HDR-style log-linear buckets:
+# 2**SUB_BITS buckets per power of two, i.e. about 6% relative precision at any scale,
+# in a flat array of counts. Nothing is recorded until METRICS.enabled is set; dumps go
+# to stderr or a file (on SIGUSR1 or every N seconds) or are served over local HTTP.
+
+SUB_BITS = 4
+SUB_COUNT = 1 << SUB_BITS
+
+
+class Histogram:
+    """Log-linear histogram of non-negative integers (ns)."""
+    def __init__(self):
+        self.counts = array('Q')
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def bucket(value):
+        shift = value.bit_length() - SUB_BITS - 1
+        if shift <= 0:
+            return value
+        return (shift << SUB_BITS) + (value >> shift)
+
+    @staticmethod
+    def bucket_low(index):
+        """Smallest value that lands in bucket index."""
+        if index < 2 * SUB_COUNT:
+            return index
+        shift = (index >> SUB_BITS) - 1
+        return (index - (shift << SUB_BITS)) << shift
+
+    def record(self, value):
+        if value < 0:
+            value = 0
+        index = self.bucket(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p):
+        """Lower bound of the bucket holding the p-th percentile (0-100)."""
+        if not self.count:
+            return 0
+        rank = max(1, round(self.count * p / 100.0))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(max(self.bucket_low(index), self.min), self.max)
+        return self.max
+
+
+class Metrics:
+    STAGES_ORDER = ("gap_wait", "poll_edges", "analyze_transitions", "estimate_baud", "split_durations_by_long_idle",
+                    "decode_edges", "decode_pll", "decode_uart", "decode_spi", "print", "uart_report")
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.monotonic()
+
+    now = staticmethod(time.monotonic_ns)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, stage, t0):
+        """Record the time since t0 (from now()) for stage."""
+        if self.enabled:
+            self.record(stage, time.monotonic_ns() - t0)
+
+    def record(self, stage, value_ns):
+        if self.enabled:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram()
+            hist.record(value_ns)
+
+    def report(self):
+        """Text dump of all counters and histograms (times in us)."""
+        # Dumps run on other threads and recording takes no lock: work on copies
+        counters = dict(self.counters)
+        histograms = dict(self.histograms)
+        lines = [f"# metrics after {time.monotonic() - self.started:.1f} s"]
+        for name in sorted(counters):
+            lines.append(f"{name} {counters[name]}")
+        order = {stage: i for i, stage in enumerate(self.STAGES_ORDER)}
+        for stage in sorted(histograms, key=lambda s: (order.get(s, len(order)), s)):
+            h = histograms[stage]
+            if not h.count:
+                continue
+            lines.append(f"{stage}_us count={h.count} mean={h.total / h.count / 1000:.1f} "
+                         f"p50={h.percentile(50) / 1000:.1f} p90={h.percentile(90) / 1000:.1f} "
+                         f"p99={h.percentile(99) / 1000:.1f} max={h.max / 1000:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path=None):
+        text = self.report()
+        if path:
+            with open(path, "w") as f:
+                f.write(text)
+        else:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+
+    def install_signal(self, path=None, signum=signal.SIGUSR1):
+        """Dump on signum (default SIGUSR1: kill -USR1 <pid>)."""
+        signal.signal(signum, lambda *_: self.dump(path))
+
+    def start_periodic(self, interval, path=None):
+        """Dump every interval seconds from a daemon thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                self.dump(path)
+        threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+
+    def serve_http(self, port, host="127.0.0.1"):
+        """Serve report() on http://host:port/ from a daemon thread; returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.report().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+METRICS = Metrics()
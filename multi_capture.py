@@ -0,0 +1,317 @@
+import sys
+import time
+
+import pigpio
+
+import gpio_spi
+from capture_log import CaptureLogWriter
+from edge_ring import EdgeRing
+from gpio_notify import NotifyCapture
+from gpio_uart import GpioUart
+from metrics import METRICS
+from output_sink import OutputSink
+
+# Multi-pin capture: one edge source for every watched pin, demultiplexed into one
+# EdgeRing per channel, each channel with its own burst detection and decoder.
+#
+#   pigpio callbacks (one per pin; pigpio serves them all over one notification socket)
+#   or one NotifyCapture over the whole pin set
+#       -> MultiCapture.on_edge(gpio, level, tick) -> the rings of every channel using gpio
+#   MultiCapture.poll(): each channel drains its ring; a burst closes after the channel's
+#   GAP_MS of silence and is handed to its decoder.
+#
+# A pin may feed several channels (RX_AVR on GPIO 9 is also the SPI data line). Ring
+# entries of multi-pin channels carry the pin's index in the channel in the level byte
+# (index << 1 | level). All ticks come from the one pigpio clock, so MultiCapture.time_us
+# puts every channel's bursts on a shared, wrap-free microsecond timeline.
+
+MODE = "notify"          # "notify" (one notification pipe) or "callback" (pi.callback per pin)
+CAPTURE_LOG = "multi.cap"
+# (kind, name, pins): "uart" (8E2 words, decoded like main.py), "raw" (edge times),
+# "spi" (SCK first, then the data pins; settings in gpio_spi.py).
+# Pin modes are left alone: pigpio reports levels in any mode, so a pin can be watched
+# while the UART keeps it (TX_AVR arrives on GPIO 13, RXD5 of /dev/ttyAMA5).
+CHANNELS = [
+    ("uart", "RX_AVR", [9]),
+    ("spi", "SPI", [gpio_spi.SCK_PIN] + gpio_spi.DATA_PINS),
+    ("raw", "RST_AVR", [17]),
+    # ("uart", "TX_AVR", [13]),
+]
+
+
+def split_edges(transitions):
+    """[(level, tick), ...] -> parallel (levels, ticks) lists, the form GpioUart and CaptureLogWriter take."""
+    return [level for level, _ in transitions], [tick for _, tick in transitions]
+
+
+class Channel:
+    """
+    Burst collector for a group of pins. Snapshots are [(level, tick), ...] for a single
+    pin and [(pin, level, tick), ...] for several, starting with the edge that opened the
+    burst; initial_levels holds each pin's level just before it. Only edges on
+    trigger_pins (default: all) open a burst or hold it open; other pins are recorded
+    while one is open.
+    """
+    GAP_MS = 10
+    START_LEVEL = None      # only an edge to this level opens a burst (None: any edge)
+    RING_SIZE = 1 << 16
+
+    def __init__(self, name, pins, gap_ms=None):
+        self.name = name
+        self.pins = list(pins)
+        if gap_ms is not None:
+            self.GAP_MS = gap_ms
+        self.ring = EdgeRing(self.RING_SIZE)
+        self.dropped = 0
+        self.trigger_pins = set(self.pins)
+        self.levels = {pin: 1 for pin in self.pins}    # current level per pin (poll side)
+        self.initial_levels = {}
+        self.transitions = []
+        self.last_event_tick = 0
+        self.last_idle_tick = 0
+
+    def codes(self):
+        """Ring code per pin: or-ed with the level by MultiCapture.on_edge."""
+        if len(self.pins) == 1:
+            return {self.pins[0]: 0}
+        return {pin: i << 1 for i, pin in enumerate(self.pins)}
+
+    def reset_levels(self, bank):
+        for pin in self.pins:
+            self.levels[pin] = (bank >> pin) & 1
+
+    def poll(self):
+        """Drain the ring into self.transitions; returns the number of edges."""
+        codes, ticks = self.ring.drain()
+        if self.ring.dropped != self.dropped:
+            print(f"{self.name}: edge ring overflow, {self.ring.dropped - self.dropped} edges dropped", flush=True)
+            METRICS.count("edges_dropped", self.ring.dropped - self.dropped)
+            self.dropped = self.ring.dropped
+        single = len(self.pins) == 1
+        pins = self.pins
+        triggers = self.trigger_pins
+        for code, tick in zip(codes, ticks):
+            level = code & 1
+            pin = pins[code >> 1]
+            if pin not in triggers:
+                if self.transitions:
+                    self.transitions.append((level, tick) if single else (pin, level, tick))
+                self.levels[pin] = level
+                continue
+            if not self.transitions:
+                if self.START_LEVEL is not None and level != self.START_LEVEL:
+                    self.last_idle_tick = tick
+                    self.levels[pin] = level
+                    continue
+                if self.START_LEVEL is not None and \
+                        pigpio.tickDiff(self.last_idle_tick, tick) <= self.GAP_MS * 1000:
+                    self.levels[pin] = level
+                    continue
+                self.initial_levels = dict(self.levels)
+            self.transitions.append((level, tick) if single else (pin, level, tick))
+            self.levels[pin] = level
+            self.last_event_tick = tick
+        return len(ticks)
+
+    def take_snapshot(self, now_tick):
+        """The closed burst if the channel has been quiet for GAP_MS at now_tick, else None."""
+        if not self.transitions or pigpio.tickDiff(self.last_event_tick, now_tick) <= self.GAP_MS * 1000:
+            return None
+        snapshot = self.transitions
+        self.transitions = []
+        self.last_idle_tick = self.last_event_tick
+        return snapshot
+
+    def log(self, capture_log, snapshot):
+        """Store the burst as one GPIO record per pin."""
+        if len(self.pins) == 1:
+            capture_log.write_gpio(self.pins[0], *split_edges(snapshot))
+            return
+        for pin in self.pins:
+            transitions = [(level, tick) for p, level, tick in snapshot if p == pin]
+            if transitions:
+                capture_log.write_gpio(pin, *split_edges(transitions))
+
+    def report(self, snapshot, capture):
+        """Print the edge times of the burst; decoding channels override this."""
+        print(f"\n=== {self.name} (GPIO {','.join(map(str, self.pins))}): {len(snapshot)} edges ===", flush=True)
+        lines = []
+        if len(self.pins) == 1:
+            for level, tick in snapshot:
+                lines.append(f"{capture.time_us(tick) / 1000:12.3f} ms  level={level}")
+        else:
+            for pin, level, tick in snapshot:
+                lines.append(f"{capture.time_us(tick) / 1000:12.3f} ms  GPIO {pin:2d} level={level}")
+        print("\n".join(lines), flush=True)
+
+
+class UartChannel(Channel):
+    """One UART line, decoded and printed exactly as main.py does for RX_AVR."""
+    START_LEVEL = 0
+    GAP_MS = GpioUart.GAP_MS
+
+    def __init__(self, name, pins, gap_ms=None):
+        super().__init__(name, pins, gap_ms)
+        if len(self.pins) != 1:
+            raise ValueError(f"{name}: a UART channel has one pin")
+        self.uart = GpioUart(None, data_pin=self.pins[0])
+
+    def take_snapshot(self, now_tick):
+        snapshot = super().take_snapshot(now_tick)
+        if snapshot:
+            # Close the last bit with a virtual transition at the end of the gap
+            last_level, last_tick = snapshot[-1]
+            snapshot.append((last_level, (last_tick + self.GAP_MS * 1000) & 0xFFFFFFFF))
+        return snapshot
+
+    def report(self, snapshot, capture):
+        from main import report_gpio_snapshot
+        print(f"\n=== {self.name} (GPIO {self.pins[0]}) @ {capture.time_us(snapshot[0][1]) / 1000:.3f} ms ===", flush=True)
+        report_gpio_snapshot(self.uart, *split_edges(snapshot))
+
+
+class RawChannel(Channel):
+    """Edge times only, e.g. reset or chip-select lines (Channel's own report)."""
+
+
+class SpiChannel(Channel):
+    """SCK plus data pins; frames end after GAP_MS without clock edges (gpio_spi.GAP_MS)."""
+    GAP_MS = gpio_spi.GAP_MS
+
+    def __init__(self, name, pins, gap_ms=None, cpol=gpio_spi.CPOL, cpha=gpio_spi.CPHA,
+                 lsb_first=gpio_spi.LSB_FIRST, bits=gpio_spi.BITS):
+        super().__init__(name, pins, gap_ms)
+        if len(self.pins) < 2:
+            raise ValueError(f"{name}: an SPI channel needs SCK and at least one data pin")
+        self.sck = self.pins[0]
+        self.data_pins = self.pins[1:]
+        self.trigger_pins = {self.sck}
+        self.cpol = cpol
+        self.cpha = cpha
+        self.lsb_first = lsb_first
+        self.bits = bits
+
+    def decode(self, snapshot):
+        return gpio_spi.decode_spi(snapshot, self.initial_levels, self.sck, self.data_pins,
+                                   self.cpol, self.cpha, self.lsb_first, self.bits)
+
+    def report(self, snapshot, capture):
+        t0 = METRICS.now()
+        decoded = self.decode(snapshot)
+        METRICS.observe("decode_spi", t0)
+        print(f"\n=== {self.name} (SCK {self.sck}) @ {capture.time_us(snapshot[0][2]) / 1000:.3f} ms ===", flush=True)
+        gpio_spi.print_frame(self.name, decoded)
+
+
+CHANNEL_TYPES = {"uart": UartChannel, "raw": RawChannel, "spi": SpiChannel}
+
+
+class MultiCapture:
+    """One edge stream for all the pins of a set of channels."""
+    def __init__(self, pi, channels):
+        self.pi = pi
+        self.channels = list(channels)
+        self.routes = {}            # gpio -> [(ring, code), ...]
+        for channel in self.channels:
+            for pin, code in channel.codes().items():
+                self.routes.setdefault(pin, []).append((channel.ring, code))
+        self.pins = sorted(self.routes)
+        self.callbacks = []
+        self.notify = None
+        self.base_tick = 0
+        self.base_us = 0
+
+    def on_edge(self, gpio, level, tick):
+        """pigpio callback signature; runs on the callback thread and only fills rings."""
+        for ring, code in self.routes.get(gpio, ()):
+            ring.push(code | level, tick)
+
+    def start(self, mode=MODE):
+        if mode == "notify":
+            self.notify = NotifyCapture(self.pi, self.pins)
+            self.notify.start()
+            bank = self.notify.last_level
+        else:
+            bank = self.pi.read_bank_1()
+            self.callbacks = [self.pi.callback(pin, pigpio.EITHER_EDGE, self.on_edge) for pin in self.pins]
+        now = self.pi.get_current_tick()
+        self.base_tick = now
+        self.base_us = 0
+        for channel in self.channels:
+            channel.reset_levels(bank)
+            channel.last_idle_tick = (now - channel.GAP_MS * 2000) & 0xFFFFFFFF
+        print(f"Capturing GPIO {', '.join(map(str, self.pins))} for "
+              f"{', '.join(channel.name for channel in self.channels)} ({mode}).", flush=True)
+
+    def stop(self):
+        for callback in self.callbacks:
+            callback.cancel()
+        self.callbacks = []
+        if self.notify:
+            self.notify.stop()
+            self.notify = None
+
+    def time_us(self, tick):
+        """Microseconds since start() on one timeline for every channel (ticks within ~35 min)."""
+        diff = (tick - self.base_tick) & 0xFFFFFFFF
+        if diff >= 1 << 31:
+            diff -= 1 << 32
+        t = self.base_us + diff
+        if diff > 1 << 30:
+            # Move the anchor along so the 32-bit window follows the clock
+            self.base_tick = tick
+            self.base_us = t
+        return t
+
+    def poll(self):
+        """Drain all channels; returns [(channel, snapshot)] for the bursts that closed."""
+        if self.notify:
+            self.notify.poll(self.on_edge)
+        edges = 0
+        for channel in self.channels:
+            edges += channel.poll()
+        METRICS.count("edges", edges)
+        now = self.pi.get_current_tick()
+        closed = []
+        for channel in self.channels:
+            snapshot = channel.take_snapshot(now)
+            if snapshot:
+                closed.append((channel, snapshot))
+        # Oldest burst first, whatever the channel
+        closed.sort(key=lambda item: self.time_us(item[1][0][-1]))
+        return closed
+
+
+def build_channels(config):
+    return [CHANNEL_TYPES[kind](name, pins) for kind, name, pins in config]
+
+
+def main(config=None, mode=MODE):
+    pi = pigpio.pi()
+    if not pi.connected:
+        print("Error: Could not connect to pigpiod. Is it running?", flush=True)
+        print("Start it with: sudo systemctl enable --now pigpiod", flush=True)
+        raise SystemExit(1)
+    capture = MultiCapture(pi, build_channels(config or CHANNELS))
+    capture_log = CaptureLogWriter(CAPTURE_LOG)
+    sink = OutputSink().install()
+    try:
+        capture.start(mode)
+        while True:
+            for channel, snapshot in capture.poll():
+                channel.log(capture_log, snapshot)
+                channel.report(snapshot, capture)
+                METRICS.count("frames_" + channel.name)
+            sink.commit()
+            time.sleep(0.01)
+    except KeyboardInterrupt:
+        print("\nStopping capture...", flush=True)
+    finally:
+        capture.stop()
+        capture_log.close()
+        sink.close()
+        pi.stop()
+
+
+if __name__ == "__main__":
+    main(mode=sys.argv[1] if len(sys.argv) > 1 else MODE)
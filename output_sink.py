@@ -0,0 +1,79 @@
+import io
+import queue
+import sys
+import threading
+
+class OutputSink(io.TextIOBase):
+    """
+    Stand-in for sys.stdout that keeps console writes off the capture thread.
+    print() calls (flush=True included) only append to the current frame buffer;
+    commit() hands the whole frame to a background writer thread through a bounded
+    queue, which writes it with one call. When the queue is full, policy "block"
+    waits for the writer and policy "drop" discards the frame and counts it.
+    """
+    def __init__(self, stream=None, maxsize=256, policy="block"):
+        if policy not in ("block", "drop"):
+            raise ValueError(f"unknown policy {policy!r}")
+        self.stream = stream or sys.stdout
+        self.policy = policy
+        self.parts = []
+        self.queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.saved_stdout = None
+        self.thread = threading.Thread(target=self.run, name="output-sink", daemon=True)
+        self.thread.start()
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        self.parts.append(s)
+        return len(s)
+
+    def flush(self):
+        # print(..., flush=True) lands here; frames are written by commit()
+        pass
+
+    def commit(self):
+        """Queue everything written since the last commit as one chunk."""
+        if not self.parts:
+            return
+        if self.dropped != self.reported_dropped:
+            # Mark the gap where the dropped frames would have been
+            self.parts.insert(0, f"[output sink: dropped {self.dropped - self.reported_dropped} frames]\n")
+        text = "".join(self.parts)
+        self.parts.clear()
+        if self.policy == "block":
+            self.queue.put(text)
+            return
+        try:
+            self.queue.put_nowait(text)
+            self.reported_dropped = self.dropped
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            text = self.queue.get()
+            if text is None:
+                break
+            self.stream.write(text)
+            self.stream.flush()
+
+    def install(self):
+        """Route print() through this sink."""
+        self.saved_stdout = sys.stdout
+        sys.stdout = self
+        return self
+
+    def close(self):
+        """Write out what is pending, stop the writer and restore sys.stdout."""
+        if self.thread.is_alive():
+            self.commit()
+            self.queue.put(None)
+            self.thread.join()
+        if self.saved_stdout is not None:
+            sys.stdout = self.saved_stdout
+            self.saved_stdout = None
+        super().close()
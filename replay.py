@@ -0,0 +1,108 @@
+import argparse
+import contextlib
+import io
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from capture_log import CaptureLogReader
+from gpio_uart import GpioUart
+
+# Offline replay: re-run split_durations_by_long_idle -> decode_edges -> decode_uart over
+# recorded GPIO captures, one capture per job, fanned out across worker processes.
+# Output is the same text main.py prints live, written in capture order.
+#
+#   python replay.py capture.cap [more.cap | data.txt ...] --workers 8 -o decoded.txt
+
+LEVEL_DURATION = re.compile(rb"Level: (\d+), Duration: (\d+)")
+
+
+def load_capture_log(path):
+    """GPIO (levels, ticks) snapshots from a capture log, in order."""
+    reader = CaptureLogReader(path)
+    snapshots = [record[3:5] for record in reader if record[0] == 'G']
+    reader.close()
+    return snapshots
+
+
+def load_level_duration_text(path, gap_us=GpioUart.GAP_MS * 1000):
+    """
+    Transitions from 'Level: N, Duration: M' text (archive/decoder.py format),
+    parsed with one findall over the whole file and cut into snapshots at idle gaps.
+    """
+    with open(path, 'rb') as f:
+        pairs = LEVEL_DURATION.findall(f.read())
+    snapshots = []
+    levels = []
+    ticks = []
+    tick = 0
+    for level, duration in pairs:
+        level = int(level)
+        duration = int(duration)
+        levels.append(level)
+        ticks.append(tick & 0xFFFFFFFF)
+        tick += duration
+        if duration > gap_us:
+            # Idle: close the burst before it (a lone idle level is not a burst)
+            if len(ticks) > 1:
+                levels.append(level)
+                ticks.append(tick & 0xFFFFFFFF)
+                snapshots.append((levels, ticks))
+            levels = []
+            ticks = []
+    if ticks:
+        levels.append(levels[-1])
+        ticks.append(tick & 0xFFFFFFFF)
+        snapshots.append((levels, ticks))
+    return snapshots
+
+
+def load_snapshots(path):
+    with open(path, 'rb') as f:
+        is_log = f.read(4) == b'CYBC'
+    return load_capture_log(path) if is_log else load_level_duration_text(path)
+
+
+def decode_snapshot_text(snapshot):
+    """Worker: decode one snapshot and return what main.report_gpio_snapshot would print."""
+    from main import report_gpio_snapshot
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        report_gpio_snapshot(GpioUart(None, data_pin=GpioUart.DATA_PIN), *snapshot)
+    return out.getvalue()
+
+
+def replay(paths, out, workers=None, chunksize=16):
+    snapshots = []
+    for path in paths:
+        snapshots.extend(load_snapshots(path))
+    if workers == 1:
+        for snapshot in snapshots:
+            out.write(decode_snapshot_text(snapshot))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields in submission order, so frames stay in capture order
+            for text in pool.map(decode_snapshot_text, snapshots, chunksize=chunksize):
+                out.write(text)
+    return len(snapshots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-decode recorded GPIO captures offline.")
+    parser.add_argument("inputs", nargs="+", help="capture logs (capture_log.py) or 'Level: N, Duration: M' text files")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 1 = in-process)")
+    parser.add_argument("--chunksize", type=int, default=16, help="snapshots per worker task")
+    args = parser.parse_args()
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        count = replay(args.inputs, out, args.workers, args.chunksize)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Replayed {count} captures.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
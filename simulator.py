@@ -0,0 +1,488 @@
+import argparse
+import errno
+import os
+import pty
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tty
+
+import pigpio
+
+from gpio_notify import NotifyCapture
+
+# Hardware-free stand-ins for load testing the capture loop on any Linux box:
+#
+#   FakePi     drop-in for pigpio.pi. Plays (level, duration_us) waveforms on a pin in
+#              real time, delivering edges to pi.callback() functions and to notification
+#              pipes (a FIFO in place of /dev/pigpioN) in ~1 ms batches, as pigpiod does.
+#              Ticks are microseconds since a start value close to 2**32, so every run
+#              crosses the 32-bit wraparound. bb_serial_read_open/bb_serial_read decode
+#              the played waveform like pigpiod's bit-bang reader.
+#   CybikoPty  pseudo-terminal peer replaying TX_AVR frames; HardUart opens its slave end.
+#
+#   python simulator.py --gpio-rate 40 --uart-rate 40 --duration 10
+#
+# runs main.main() against both and reports what was sent against what was decoded.
+
+TICK_START = 0xFFFFFFFF - 2000000   # wraps 2 s into the run
+BATCH_S = 0.001                     # edge delivery period
+
+
+class FakeCallback:
+    def __init__(self, pi, gpio, edge, func):
+        self.pi = pi
+        self.gpio = gpio
+        self.edge = edge
+        self.func = func
+
+    def cancel(self):
+        with self.pi.lock:
+            if self in self.pi.callbacks:
+                self.pi.callbacks.remove(self)
+
+
+class FakePi:
+    """The subset of pigpio.pi used by gpio_uart.py, main.py and sclk.py."""
+    def __init__(self, host=None, port=None, tick_start=TICK_START):
+        self.connected = True
+        self.t0 = time.monotonic()
+        self.tick_start = tick_start
+        self.levels = 0xFFFFFFFF         # bank 1 levels; lines idle high
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.notifies = {}               # handle -> [fd, bits, seq, running]
+        self.bb_readers = {}             # gpio -> BitBangReader
+        self.notify_dir = tempfile.mkdtemp(prefix="fakepigpio")
+        self.notify_pipe_path = os.path.join(self.notify_dir, "pigpio{}")    # read by NotifyCapture
+        self.events = []                 # pending (us since t0, gpio, level), in time order
+        self.queue_end = 0               # us since t0 when the last scheduled waveform ends
+        self.edges_sent = 0
+        self.reports_dropped = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="fake-pigpio", daemon=True)
+        self.thread.start()
+
+    # --- time ---
+
+    def now_us(self):
+        return int((time.monotonic() - self.t0) * 1000000)
+
+    def get_current_tick(self):
+        return (self.tick_start + self.now_us()) & 0xFFFFFFFF
+
+    # --- GPIO ---
+
+    def set_mode(self, gpio, mode):
+        return 0
+
+    def set_pull_up_down(self, gpio, pud):
+        return 0
+
+    def set_glitch_filter(self, gpio, steady):
+        return 0
+
+    def read(self, gpio):
+        return (self.levels >> gpio) & 1
+
+    def read_bank_1(self):
+        return self.levels
+
+    def callback(self, user_gpio, edge=pigpio.RISING_EDGE, func=None):
+        cb = FakeCallback(self, user_gpio, edge, func)
+        with self.lock:
+            self.callbacks.append(cb)
+        return cb
+
+    def notify_open(self):
+        handle = len(self.notifies)
+        path = self.notify_pipe_path.format(handle)
+        os.mkfifo(path)
+        # O_RDWR so neither end blocks in open(); writes are non-blocking so a full pipe
+        # loses reports (and their sequence numbers) like an overrun pigpiod pipe
+        fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+        self.notifies[handle] = [fd, 0, 0, False]
+        return handle
+
+    def notify_begin(self, handle, bits):
+        self.notifies[handle][1] = bits
+        self.notifies[handle][3] = True
+        return 0
+
+    def notify_close(self, handle):
+        entry = self.notifies.pop(handle, None)
+        if entry:
+            os.close(entry[0])
+        return 0
+
+    def bb_serial_read_open(self, user_gpio, baud, bb_bits=8):
+        with self.lock:
+            self.bb_readers[user_gpio] = BitBangReader(baud, bb_bits)
+        return 0
+
+    def bb_serial_read(self, user_gpio):
+        with self.lock:
+            reader = self.bb_readers[user_gpio]
+            data = reader.data
+            reader.data = bytearray()
+        return len(data), data
+
+    def bb_serial_read_close(self, user_gpio):
+        with self.lock:
+            self.bb_readers.pop(user_gpio, None)
+        return 0
+
+    def stop(self):
+        self.running = False
+        self.connected = False
+        for handle in list(self.notifies):
+            self.notify_close(handle)
+        shutil.rmtree(self.notify_dir, ignore_errors=True)
+
+    # --- waveforms ---
+
+    def play(self, durations, gpio, gap_us=0):
+        """
+        Queue a [(level, duration_us), ...] waveform on gpio, starting now or gap_us after
+        the previously queued waveform ends. Returns the start time (us since t0).
+        """
+        with self.lock:
+            start = max(self.now_us() + 1000, self.queue_end + gap_us)
+            t = start
+            for level, duration in durations:
+                self.events.append((t, gpio, level))
+                t += duration
+            self.queue_end = t
+        return start
+
+    def play_edges(self, edges, gap_us=0):
+        """
+        Queue [(offset_us, gpio, level), ...] edges on several pins (offsets from the start,
+        in time order), like play(). Returns the start time (us since t0).
+        """
+        with self.lock:
+            start = max(self.now_us() + 1000, self.queue_end + gap_us)
+            self.events.extend((start + t, gpio, level) for t, gpio, level in edges)
+            self.events.sort(key=lambda event: event[0])    # stable: same-time edges keep their order
+            self.queue_end = max(self.queue_end, start + (edges[-1][0] if edges else 0))
+        return start
+
+    def run(self):
+        pending = []
+        while self.running:
+            time.sleep(BATCH_S)
+            now = self.now_us()
+            with self.lock:
+                if self.events and self.events[0][0] <= now:
+                    split = 0
+                    while split < len(self.events) and self.events[split][0] <= now:
+                        split += 1
+                    pending = self.events[:split]
+                    del self.events[:split]
+                callbacks = list(self.callbacks)
+            if pending:
+                self.deliver(pending, callbacks)
+                pending = []
+            with self.lock:
+                for reader in self.bb_readers.values():
+                    reader.flush(now)
+
+    def deliver(self, events, callbacks):
+        reports = {handle: bytearray() for handle in self.notifies}
+        for t, gpio, level in events:
+            mask = 1 << gpio
+            if bool(self.levels & mask) == bool(level):
+                continue
+            self.levels = self.levels | mask if level else self.levels & ~mask
+            tick = (self.tick_start + t) & 0xFFFFFFFF
+            self.edges_sent += 1
+            if gpio in self.bb_readers:
+                with self.lock:
+                    if gpio in self.bb_readers:
+                        self.bb_readers[gpio].edge(t, level)
+            for cb in callbacks:
+                if cb.gpio == gpio and (cb.edge == pigpio.EITHER_EDGE or cb.edge == (pigpio.RISING_EDGE if level else pigpio.FALLING_EDGE)):
+                    cb.func(gpio, level, tick)
+            for handle, entry in list(self.notifies.items()):
+                if entry[3] and entry[1] & mask:
+                    reports[handle] += NotifyCapture.REPORT.pack(entry[2] & 0xFFFF, 0, tick, self.levels)
+                    entry[2] += 1
+        for handle, data in reports.items():
+            if data and handle in self.notifies:
+                try:
+                    written = os.write(self.notifies[handle][0], data)
+                except OSError as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
+                    written = 0
+                # Only whole records make it; the rest are lost like an overrun pipe
+                written -= written % NotifyCapture.REPORT.size
+                if written < len(data):
+                    self.reports_dropped += (len(data) - written) // NotifyCapture.REPORT.size
+
+
+class BitBangReader:
+    """
+    pigpiod's bit-bang serial reader on one pin: a falling edge on the idle line starts a
+    word, whose bits data bits are sampled mid-bit (LSB first, stop bits not checked).
+    Words are 1, 2 or 4 little-endian bytes, by bits, as bb_serial_read returns them.
+    """
+    def __init__(self, baud, bits):
+        self.bit_us = 1000000 / baud
+        self.bits = bits
+        self.size = 1 if bits <= 8 else 2 if bits <= 16 else 4
+        self.data = bytearray()
+        self.start = None               # us since t0 of the current word's start edge
+        self.edges = []                 # (t, level) since the start edge
+
+    def edge(self, t, level):
+        self.flush(t)
+        if self.start is not None:
+            self.edges.append((t, level))
+        elif level == 0:
+            self.start = t
+            self.edges = [(t, 0)]
+
+    def flush(self, now):
+        """Finish the current word once the line has passed its last sample point."""
+        if self.start is None or now <= self.start + (self.bits + 0.5) * self.bit_us:
+            return
+        word = 0
+        k = 0
+        level = 0
+        for bit in range(self.bits):
+            sample = self.start + (bit + 1.5) * self.bit_us
+            while k < len(self.edges) and self.edges[k][0] <= sample:
+                level = self.edges[k][1]
+                k += 1
+            word |= level << bit
+        self.data += word.to_bytes(self.size, 'little')
+        self.start = None
+
+
+class CybikoPty:
+    """
+    Pseudo-terminal peer that writes TX frames at a fixed rate; open slave_name with HardUart.
+    Frames are at least min_gap apart, or HardUart would join them into one burst.
+    """
+    def __init__(self, frames, rate, min_gap=0.02):
+        self.frames = frames
+        self.rate = rate
+        self.min_gap = min_gap
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)
+        self.slave_name = os.ttyname(self.slave)
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="cybiko-pty", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        period = max(1.0 / self.rate, self.min_gap)
+        next_t = time.monotonic()
+        i = 0
+        while self.running:
+            frame = self.frames[i % len(self.frames)]
+            os.write(self.master, frame)
+            self.frames_sent += 1
+            self.bytes_sent += len(frame)
+            i += 1
+            next_t += period
+            time.sleep(max(0.0, next_t - time.monotonic()))
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join()
+
+    def close(self):
+        self.stop()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def corpus_sources():
+    """(RX word lists, TX frames) from the packet_* corpus."""
+    from bench_decode import load_corpus
+
+    rx = []
+    tx = []
+    for name, words in load_corpus():
+        if name.endswith("_tx.txt"):
+            tx.append(bytes(w & 0xFF for w in words))
+        else:
+            rx.append(words)
+    return rx, tx
+
+
+def recorded_waveforms(path):
+    """(level, duration_us) waveforms of the GPIO snapshots in a capture log."""
+    from capture_log import CaptureLogReader
+
+    reader = CaptureLogReader(path)
+    waveforms = []
+    for record in reader:
+        if record[0] == 'G':
+            levels, ticks = record[3:5]
+            waveforms.append([(levels[i], pigpio.tickDiff(ticks[i], ticks[i + 1]))
+                              for i in range(len(ticks) - 1)])
+    reader.close()
+    return waveforms
+
+
+def encode_spi(data, sck, data_pin, half_us, cpol=0, cpha=0, lsb_first=False):
+    """
+    (offset_us, gpio, level) edges of an SPI transfer of data. As a real slave does, the
+    data line changes on the same tick as the shifting clock edge and is sampled on the
+    other one; the clock is driven to its idle level first.
+    """
+    edges = [(0, sck, cpol)]
+    t = half_us
+    for byte in data:
+        for i in range(8):
+            bit = (byte >> (i if lsb_first else 7 - i)) & 1
+            if cpha == 0:
+                edges.append((t, data_pin, bit))
+                edges.append((t + half_us, sck, 1 - cpol))      # leading edge: sample
+                edges.append((t + 2 * half_us, sck, cpol))      # trailing edge: shift
+            else:
+                edges.append((t, sck, 1 - cpol))                # leading edge: shift
+                edges.append((t, data_pin, bit))
+                edges.append((t + half_us, sck, cpol))          # trailing edge: sample
+            t += 2 * half_us
+    edges.append((t + half_us, data_pin, 1))                    # release the line
+    return edges
+
+
+def feed_gpio(pi, waveforms, rate, gpio, gap_us, stop):
+    """
+    Queue one waveform every 1/rate s. Bursts never overlap and are gap_us apart, so past
+    what the line can carry the rate saturates instead of queueing without bound.
+    """
+    period = 1.0 / rate
+    i = 0
+    next_t = time.monotonic()
+    while not stop.is_set():
+        pi.play(waveforms[i % len(waveforms)], gpio, gap_us)
+        i += 1
+        next_t = max(next_t + period, time.monotonic() + (pi.queue_end - pi.now_us()) / 1e6 - period)
+        stop.wait(max(0.0, next_t - time.monotonic()))
+    return i
+
+
+def load_test(gpio_rate, uart_rate, duration, engine="poll", gpio_mode="notify", recorded=None, jitter_us=0.5, seed=1):
+    """Run main.main()/async_main() against FakePi and CybikoPty for duration seconds; returns a stats dict."""
+    import asyncio
+    import main
+    from bench_decode import encode_8e2
+    from gpio_uart import GpioUart
+    from metrics import METRICS
+
+    rng = random.Random(seed)
+    rx_words, tx_frames = corpus_sources()
+    if recorded:
+        waveforms = recorded_waveforms(recorded)
+    else:
+        waveforms = [encode_8e2(words, jitter_us=jitter_us, rng=rng) for words in rx_words]
+
+    # One simulated daemon behind every pigpio.pi() connection (GpioUart opens two)
+    pi = FakePi()
+    real_pi = pigpio.pi
+    pigpio.pi = lambda *args, **kwargs: pi
+    peer = CybikoPty(tx_frames, uart_rate) if uart_rate else None
+    spare = None if peer else pty.openpty()     # a silent port when no TX frames are sent
+    main.UART_PORT = peer.slave_name if peer else os.ttyname(spare[1])
+    main.GPIO_MODE = gpio_mode
+    main.CAPTURE_LOG = os.path.join(tempfile.mkdtemp(prefix="simcap"), "capture.cap")
+    main.METRICS_FILE = os.devnull
+    METRICS.counters.clear()
+    METRICS.histograms.clear()
+
+    stop = threading.Event()
+    fed = []
+
+    def driver():
+        time.sleep(0.2)     # main() startup
+        if peer:
+            peer.start()
+        if gpio_rate:
+            fed.append(feed_gpio(pi, waveforms, gpio_rate, GpioUart.DATA_PIN, GpioUart.GAP_MS * 1500, stop))
+        stop.wait()
+        if peer:
+            peer.stop()
+        # Let the last queued bursts play out and drain before stopping main
+        time.sleep(0.3 + max(0, pi.queue_end - pi.now_us()) / 1e6)
+        os.kill(os.getpid(), signal.SIGINT)
+
+    threading.Timer(duration, stop.set).start()
+    threading.Thread(target=driver, daemon=True).start()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    started = time.monotonic()
+    cpu = time.process_time()
+    try:
+        if engine == "asyncio":
+            try:
+                asyncio.run(main.async_main())
+            except KeyboardInterrupt:
+                pass
+        else:
+            main.main()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+        pigpio.pi = real_pi
+        pi.stop()
+        if peer:
+            peer.close()
+        if spare:
+            os.close(spare[0])
+            os.close(spare[1])
+    elapsed = time.monotonic() - started
+    counters = METRICS.counters
+    return {
+        "elapsed_s": elapsed,
+        "cpu_s": time.process_time() - cpu,
+        "gpio_bursts_sent": fed[0] if fed else 0,
+        "gpio_bursts_per_s": (fed[0] if fed else 0) / duration,
+        "gpio_frames_decoded": counters.get("gpio_frames", 0),
+        "edges_sent": pi.edges_sent,
+        "edges_received": counters.get("edges", 0),
+        "edges_dropped": counters.get("edges_dropped", 0) + pi.reports_dropped,
+        "framing_errors": counters.get("framing_errors", 0),
+        "bb_framing_errors": counters.get("bb_framing_errors", 0),
+        "uart_frames_sent": peer.frames_sent if peer else 0,
+        "uart_frames_received": counters.get("uart_frames", 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test main.py against a simulated pigpiod and Cybiko.")
+    parser.add_argument("--gpio-rate", type=float, default=20, help="RX_AVR bursts per second (0: none)")
+    parser.add_argument("--uart-rate", type=float, default=20, help="TX_AVR frames per second (0: none)")
+    parser.add_argument("--duration", type=float, default=5, help="seconds")
+    parser.add_argument("--engine", choices=("poll", "asyncio"), default="poll")
+    parser.add_argument("--gpio-mode", choices=("notify", "callback", "bb_serial"), default="notify")
+    parser.add_argument("--recorded", help="capture log whose GPIO snapshots are replayed instead of the corpus")
+    parser.add_argument("--jitter", type=float, default=0.5, help="edge jitter of synthesized waveforms, +/- us")
+    args = parser.parse_args()
+    if args.engine == "asyncio" and args.gpio_mode == "bb_serial":
+        parser.error("the asyncio engine needs edge capture; use --gpio-mode notify or callback with it")
+
+    stats = load_test(args.gpio_rate, args.uart_rate, args.duration, args.engine, args.gpio_mode,
+                      args.recorded, args.jitter)
+    for key, value in stats.items():
+        print(f"{key:<22} {value:.2f}" if isinstance(value, float) else f"{key:<22} {value}")
+
+
+if __name__ == "__main__":
+    main()
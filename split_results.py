@@ -1,40 +1,52 @@
-import re
+import argparse
 import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 
+# Split a results.txt log into packets: RX blocks (Silence duration ... --- Transaction
+# Complete ---) and TX blocks (--- TX_AVR ... Checksum). Packets are written as soon as
+# their block closes, either one packet_<seq>_<rx|tx>.txt file each or appended to a
+# single archive with a text index ("seq offset length type" per line). Numbering continues
+# after the packets already on disk.
+#
+# With several workers the input is cut into byte ranges just before "--- TX_AVR" lines:
+# such a line always closes the open block and starts a new one, so every range parses
+# exactly as it would inside the whole file.
 
-def split_results_file(filename, out_prefix="packet_"):
-    with open(filename, 'r') as f:
-        lines = f.readlines()
+TX_HEADER = b"--- TX_AVR"
+SCAN_CHUNK = 1 << 16
 
-    packets = []
+
+def iter_packets(lines):
+    """Yield each packet (bytes, lines joined) as soon as its block closes."""
     packet = []
     mode = None
-    start_idx = 26
 
     for line in lines:
-        if line.startswith("Silence duration"):
+        if line.startswith(b"Silence duration"):
             if mode != "silence":
                 if packet:
-                    packets.append(''.join(packet))
+                    yield b''.join(packet)
                 packet = []
                 mode = "silence"
             packet.append(line)
-        elif line.startswith("--- TX_AVR"):
+        elif line.startswith(TX_HEADER):
             if packet:
-                packets.append(''.join(packet))
+                yield b''.join(packet)
             packet = []
             mode = "tx_avr"
             packet.append(line)
         elif mode == "silence":
             packet.append(line)
-            if line.startswith("--- Transaction Complete ---"):
-                packets.append(''.join(packet))
+            if line.startswith(b"--- Transaction Complete ---"):
+                yield b''.join(packet)
                 packet = []
                 mode = None
         elif mode == "tx_avr":
             packet.append(line)
-            if line.startswith("Checksum"):
-                packets.append(''.join(packet))
+            if line.startswith(b"Checksum"):
+                yield b''.join(packet)
                 packet = []
                 mode = None
         else:
@@ -42,21 +54,164 @@ def split_results_file(filename, out_prefix="packet_"):
 
     # Catch any trailing packet
     if packet:
-        packets.append(''.join(packet))
-
-    seq = start_idx
-    for packet in packets:
-        # Determine type by first line
-        first_line = packet.lstrip().splitlines()[0] if packet.lstrip() else ""
-        if first_line.startswith("--- TX_AVR"):
-            suffix = "tx"
-        else:
-            suffix = "rx"
-        out_name = f"packet_{seq}_{suffix}.txt"
-        with open(out_name, "w") as out:
+        yield b''.join(packet)
+
+
+def packet_type(packet):
+    """'tx' or 'rx', by the first line."""
+    return "tx" if packet.lstrip().startswith(TX_HEADER) else "rx"
+
+
+def read_range(filename, start, end):
+    """Lines of filename[start:end]; start and end are line boundaries."""
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        pos = start
+        for line in f:
+            if pos >= end:
+                break
+            pos += len(line)
+            yield line
+
+
+def safe_boundaries(filename, parts):
+    """Byte offsets that cut filename into up to parts ranges, each starting at a TX_AVR line."""
+    size = os.path.getsize(filename)
+    cuts = [0]
+    with open(filename, 'rb') as f:
+        for i in range(1, parts):
+            target = max(size * i // parts, cuts[-1] + 1)
+            f.seek(target - 1)
+            pos = target - 1
+            while True:
+                chunk = f.read(SCAN_CHUNK + len(TX_HEADER))
+                hit = chunk.find(b"\n" + TX_HEADER)
+                if hit >= 0:
+                    cuts.append(pos + hit + 1)
+                    break
+                if len(chunk) <= len(TX_HEADER):
+                    break
+                pos += SCAN_CHUNK
+                f.seek(pos)
+    cuts.append(size)
+    return sorted(set(cuts))
+
+
+def next_seq(out_dir, out_prefix, archive=None):
+    """First free packet number: after the packet files in out_dir, or after the archive's index."""
+    if archive:
+        seq = 0
+        if os.path.exists(archive + ".idx"):
+            with open(archive + ".idx") as f:
+                for line in f:
+                    seq = int(line.split()[0]) + 1
+        return seq
+    pattern = re.compile(re.escape(out_prefix) + r"(\d+)_(?:rx|tx)\.txt$")
+    numbers = [int(m.group(1)) for m in map(pattern.match, os.listdir(out_dir or ".")) if m]
+    return max(numbers) + 1 if numbers else 0
+
+
+def count_range(job):
+    filename, start, end = job
+    return sum(1 for _ in iter_packets(read_range(filename, start, end)))
+
+
+def write_files_range(job):
+    """Write the packets of one range as numbered files; returns (rx, tx) counts."""
+    filename, start, end, seq, out_dir, out_prefix = job
+    counts = {"rx": 0, "tx": 0}
+    for packet in iter_packets(read_range(filename, start, end)):
+        suffix = packet_type(packet)
+        with open(os.path.join(out_dir, f"{out_prefix}{seq}_{suffix}.txt"), "wb") as out:
             out.write(packet.lstrip())
-        print(f"Wrote {out_name} ({len(packet)} bytes)")
+        counts[suffix] += 1
         seq += 1
+    return counts["rx"], counts["tx"]
+
+
+def write_archive_range(job):
+    """Append the packets of one range to a part file; returns [(offset, length, type)] within it."""
+    filename, start, end, part = job
+    entries = []
+    offset = 0
+    with open(part, "wb") as out:
+        for packet in iter_packets(read_range(filename, start, end)):
+            data = packet.lstrip()
+            out.write(data)
+            entries.append((offset, len(data), packet_type(packet)))
+            offset += len(data)
+    return entries
+
+
+def split_results_file(filename, out_prefix="packet_", out_dir=".", archive=None, workers=1, start_idx=None):
+    """
+    Split filename into packets. Returns (first seq, rx count, tx count).
+    archive: write <archive> plus <archive>.idx instead of one file per packet.
+    """
+    seq = next_seq(out_dir, out_prefix, archive) if start_idx is None else start_idx
+    cuts = safe_boundaries(filename, workers) if workers > 1 else [0, os.path.getsize(filename)]
+    ranges = list(zip(cuts, cuts[1:]))
+    pool = ProcessPoolExecutor(max_workers=workers) if len(ranges) > 1 else None
+    mapper = pool.map if pool else map
+    try:
+        if archive:
+            parts = [f"{archive}.part{i}" for i in range(len(ranges))]
+            part_entries = list(mapper(write_archive_range, [(filename, s, e, p) for (s, e), p in zip(ranges, parts)]))
+            rx = tx = 0
+            with open(archive, "ab") as out, open(archive + ".idx", "a") as idx:
+                base = out.tell()
+                n = seq
+                for part, entries in zip(parts, part_entries):
+                    with open(part, "rb") as f:
+                        shutil.copyfileobj(f, out)
+                    os.remove(part)
+                    for offset, length, kind in entries:
+                        idx.write(f"{n} {base + offset} {length} {kind}\n")
+                        n += 1
+                        rx += kind == "rx"
+                        tx += kind == "tx"
+                    base += sum(length for _, length, _ in entries)
+        else:
+            # Number each range from the packet count of the ranges before it
+            starts = [seq]
+            if len(ranges) > 1:
+                for count in mapper(count_range, [(filename, s, e) for s, e in ranges[:-1]]):
+                    starts.append(starts[-1] + count)
+            jobs = [(filename, s, e, first, out_dir, out_prefix) for (s, e), first in zip(ranges, starts)]
+            results = list(mapper(write_files_range, jobs))
+            rx = sum(r for r, _ in results)
+            tx = sum(t for _, t in results)
+    finally:
+        if pool:
+            pool.shutdown()
+    target = archive or os.path.join(out_dir, f"{out_prefix}{seq}..{seq + rx + tx - 1}_*.txt")
+    print(f"Wrote {rx + tx} packets ({rx} rx, {tx} tx) to {target}")
+    return seq, rx, tx
+
+
+def read_archive_packet(archive, seq):
+    """Packet seq of an archive, as (type, bytes)."""
+    with open(archive + ".idx") as idx:
+        for line in idx:
+            n, offset, length, kind = line.split()
+            if int(n) == seq:
+                with open(archive, "rb") as f:
+                    f.seek(int(offset))
+                    return kind, f.read(int(length))
+    raise KeyError(seq)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a results.txt log into rx/tx packets.")
+    parser.add_argument("input", nargs="?", default="results.txt")
+    parser.add_argument("--prefix", default="packet_", help="packet file name prefix")
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--archive", help="write one archive file (plus ARCHIVE.idx) instead of per-packet files")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--start", type=int, default=None, help="first packet number (default: continue after existing)")
+    args = parser.parse_args()
+    split_results_file(args.input, args.prefix, args.out_dir, args.archive, args.workers, args.start)
+
 
 if __name__ == "__main__":
-    split_results_file("results.txt")
+    main()
@@ -0,0 +1,61 @@
+from array import array
+
+from capture_log import CaptureLogReader, CaptureLogWriter, TRAILER_MAGIC
+
+
+def write_sample(path):
+    log = CaptureLogWriter(path)
+    # Ticks wrap around 2^32 inside the snapshot
+    log.write_gpio(17, array('B', [0, 1, 0]), array('I', [0xFFFFFFF0, 0xFFFFFFFA, 0x10]), t_ns=1000)
+    log.write_uart("TX_AVR", b"\x00\xff\x7f", now=2.5, delta=0.012)
+    log.write_words(17, [0x14D, 0x1C0, 0x1FF], t_ns=3000)
+    return log
+
+
+EXPECTED = [
+    ('G', 1000, 17, array('B', [0, 1, 0]), array('I', [0xFFFFFFF0, 0xFFFFFFFA, 0x10])),
+    ('U', 2500000000, 12000000, "TX_AVR", b"\x00\xff\x7f"),
+    ('W', 3000, 17, [0x14D, 0x1C0, 0x1FF]),
+]
+
+
+def read_all(path):
+    reader = CaptureLogReader(path)
+    try:
+        return list(reader)
+    finally:
+        reader.close()
+
+
+def test_round_trip_through_the_index(tmp_path):
+    path = str(tmp_path / "capture.cap")
+    write_sample(path).close()
+    assert read_all(path) == EXPECTED
+
+
+def test_log_without_trailer_is_scanned(tmp_path):
+    path = str(tmp_path / "capture.cap")
+    log = write_sample(path)
+    log.f.close()   # crash: no index or trailer
+    assert read_all(path) == EXPECTED
+
+
+def test_torn_last_record_is_ignored(tmp_path):
+    path = str(tmp_path / "capture.cap")
+    log = write_sample(path)
+    log.f.close()
+    with open(path, 'ab') as f:
+        f.write(b"G\x40\x01\x02")
+    assert read_all(path) == EXPECTED
+
+
+def test_reopening_appends_after_the_last_record(tmp_path):
+    path = str(tmp_path / "capture.cap")
+    write_sample(path).close()
+    log = CaptureLogWriter(path)
+    log.write_words(17, [0x04D], t_ns=4000)
+    log.close()
+    assert read_all(path) == EXPECTED + [('W', 4000, 17, [0x04D])]
+    # The old index and trailer were dropped, not left in the middle of the file
+    with open(path, 'rb') as f:
+        assert f.read().count(TRAILER_MAGIC) == 1
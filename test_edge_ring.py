@@ -0,0 +1,53 @@
+import pytest
+
+from edge_ring import EdgeRing
+
+
+def test_capacity_must_be_a_power_of_two():
+    with pytest.raises(ValueError):
+        EdgeRing(6)
+
+
+def test_drain_returns_edges_oldest_first():
+    ring = EdgeRing(8)
+    for i in range(5):
+        ring.push(i & 1, 1000 + i)
+    levels, ticks = ring.drain()
+    assert list(levels) == [0, 1, 0, 1, 0]
+    assert list(ticks) == [1000, 1001, 1002, 1003, 1004]
+    assert len(ring) == 0
+    levels, ticks = ring.drain()
+    assert len(levels) == len(ticks) == 0
+
+
+def test_drain_joins_slices_across_the_wraparound():
+    ring = EdgeRing(8)
+    for i in range(6):
+        ring.push(1, i)
+    ring.drain()
+    for i in range(6, 13):
+        ring.push(i & 1, i)
+    levels, ticks = ring.drain()
+    assert list(ticks) == list(range(6, 13))
+    assert list(levels) == [i & 1 for i in range(6, 13)]
+
+
+def test_drain_max_edges_leaves_the_rest_queued():
+    ring = EdgeRing(4)
+    for i in range(4):
+        ring.push(0, i)
+    assert list(ring.drain(3)[1]) == [0, 1, 2]
+    ring.push(0, 4)
+    ring.push(0, 5)
+    assert list(ring.drain(2)[1]) == [3, 4]
+    assert list(ring.drain()[1]) == [5]
+
+
+def test_push_drops_edges_when_full():
+    ring = EdgeRing(4)
+    assert all(ring.push(0, i) for i in range(4))
+    assert not ring.push(0, 4)
+    assert ring.dropped == 1
+    assert list(ring.drain()[1]) == [0, 1, 2, 3]
+    assert ring.push(0, 5)
+    assert ring.dropped == 1
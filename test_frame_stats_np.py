@@ -0,0 +1,17 @@
+from frame_stats_np import analyze_frames
+
+
+def test_xor_uses_the_last_frame_of_the_same_length():
+    # Replies of another length sit between the 3-byte frames, as on a real link
+    frames = [b"\x01\x02\x03", b"\x10", b"\x01\x05\x06", b"\x11", b"\x01\x05\x07"]
+    r = analyze_frames(frames)[3]
+    assert r["has_xor"].tolist() == [False, True, True]
+    assert r["xor"].tolist() == [[0, 0, 0], [0, 7, 5], [0, 0, 1]]
+    assert r["heatmap"].tolist() == [0, 1, 2]
+    assert r["checksum_ok"].tolist() == [True, True, False]
+
+
+def test_one_byte_frames_have_no_checksum():
+    r = analyze_frames([b"\x10", b"\x11"])[1]
+    assert r["checksum_ok"] is None
+    assert r["heatmap"].tolist() == [1]
@@ -0,0 +1,53 @@
+from gpio_notify import NotifyCapture
+
+REPORT = NotifyCapture.REPORT
+
+
+def reports(*records):
+    """Raw pipe bytes for (seq, flags, tick, level) records."""
+    return b"".join(REPORT.pack(*r) for r in records)
+
+
+def collect(capture, chunks):
+    edges = []
+    for chunk in chunks:
+        capture.feed(chunk, lambda gpio, level, tick: edges.append((gpio, level, tick)))
+    return edges
+
+
+def test_feed_reports_edges_of_watched_pins():
+    capture = NotifyCapture(None, [9], last_level=1 << 9)
+    data = reports((0, 0, 100, 0), (1, 0, 126, 1 << 9), (2, 0, 130, (1 << 9) | (1 << 4)))
+    assert collect(capture, [data]) == [(9, 0, 100), (9, 1, 126)]
+    assert capture.seq_gaps == 0
+
+
+def test_feed_keeps_partial_records_for_the_next_call():
+    capture = NotifyCapture(None, [9], last_level=1 << 9)
+    data = reports((0, 0, 100, 0), (1, 0, 126, 1 << 9), (2, 0, 152, 0))
+    whole = collect(NotifyCapture(None, [9], last_level=1 << 9), [data])
+    # Cut at every byte offset, including inside the 12-byte records
+    for cut in range(1, len(data)):
+        capture = NotifyCapture(None, [9], last_level=1 << 9)
+        assert collect(capture, [data[:cut], data[cut:]]) == whole
+        assert capture.pending == b""
+
+
+def test_feed_skips_flagged_reports_and_counts_sequence_gaps():
+    capture = NotifyCapture(None, [9], last_level=1 << 9)
+    data = reports((0, 0, 100, 0), (1, 0x40, 110, 1 << 9), (5, 0, 140, 1 << 9))
+    assert collect(capture, [data]) == [(9, 0, 100), (9, 1, 140)]
+    assert capture.seq_gaps == 3
+
+
+def test_skip_tracks_level_and_sequence_across_partial_records():
+    data = reports((0, 0, 100, 0), (1, 0, 126, 1 << 9))
+    capture = NotifyCapture(None, [9], last_level=1 << 9)
+    capture.skip(data[:17])
+    capture.skip(data[17:])
+    assert capture.pending == b""
+    assert capture.last_seq == 1
+    assert capture.last_level == 1 << 9
+    # Edges resume from the skipped state: no spurious edge, no sequence gap
+    assert collect(capture, [reports((2, 0, 150, 0))]) == [(9, 0, 150)]
+    assert capture.seq_gaps == 0
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from bench_decode import encode_8e2
+from gpio_uart import GpioUartStream
+
+WORDS = [0x14D, 0x1C0, 0x00, 0xFF, 0x55, 0x1AA] * 4
+TICK_START = 0xFFFFF000     # the burst crosses the 32-bit tick wraparound
+
+
+def edges(durations):
+    levels = []
+    ticks = []
+    tick = TICK_START
+    for level, duration in durations:
+        levels.append(level)
+        ticks.append(tick)
+        tick = (tick + duration) & 0xFFFFFFFF
+    return levels, ticks, tick
+
+
+def decode(levels, ticks, end_tick, chunk, auto_baud=False):
+    stream = GpioUartStream(auto_baud=auto_baud)
+    words = []
+    for i in range(0, len(ticks), chunk):
+        words += stream.feed(levels[i:i + chunk], ticks[i:i + chunk])
+    words += stream.end_burst((end_tick + 10000) & 0xFFFFFFFF)
+    return words, stream.framing_errors
+
+
+@pytest.mark.parametrize("auto_baud, baud_error", [(False, 0.0), (True, 0.02)])
+def test_chunked_feed_gives_the_same_words(auto_baud, baud_error):
+    durations = encode_8e2(WORDS, jitter_us=1, baud_error=baud_error, rng=random.Random(5))
+    levels, ticks, end_tick = edges(durations)
+    whole = decode(levels, ticks, end_tick, len(ticks), auto_baud)
+    assert whole == (WORDS, 0)
+    for chunk in (1, 2, 3, 7, 31):
+        assert decode(levels, ticks, end_tick, chunk, auto_baud) == whole
+
+
+def test_words_are_returned_once_their_stop_bits_are_covered():
+    levels, ticks, end_tick = edges(encode_8e2(WORDS[:3], rng=random.Random(5)))
+    stream = GpioUartStream()
+    early = stream.feed(levels, ticks)
+    # The last frame ends on the idle line, so only end_burst completes it
+    assert early == WORDS[:2]
+    assert stream.end_burst((end_tick + 10000) & 0xFFFFFFFF) == WORDS[2:3]
+    assert stream.first_tick is None
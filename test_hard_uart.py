@@ -0,0 +1,152 @@
+import os
+import pty
+import termios
+import time
+import tty
+
+import pytest
+
+from hard_uart import HardUart
+
+
+@pytest.fixture
+def port():
+    """A raw pty pair: HardUart opens the slave, the test writes to the master."""
+    master, slave = pty.openpty()
+    tty.setraw(slave)
+    yield master, os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+def wait_frames(uart, count, timeout=2.0):
+    frames = []
+    deadline = time.monotonic() + timeout
+    while len(frames) < count and time.monotonic() < deadline:
+        frames += uart.get_frames()
+        time.sleep(0.01)
+    return frames
+
+
+def test_reader_thread_splits_frames_on_gap(port):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.02)
+    uart.start_reader()
+    try:
+        os.write(master, b"\x01\x02\x03")
+        time.sleep(0.1)
+        os.write(master, b"\x04\x05")
+        frames = wait_frames(uart, 2)
+    finally:
+        uart.stop_reader()
+        uart.ser.close()
+    assert [bytes(f) for f, now, delta in frames] == [b"\x01\x02\x03", b"\x04\x05"]
+    for f, now, delta in frames:
+        assert delta >= 0.02
+
+
+def test_reader_thread_joins_bytes_inside_the_gap(port):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.05)
+    uart.start_reader()
+    try:
+        for b in b"abcd":
+            os.write(master, bytes([b]))
+            time.sleep(0.005)
+        frames = wait_frames(uart, 1)
+    finally:
+        uart.stop_reader()
+        uart.ser.close()
+    assert [bytes(f) for f, now, delta in frames] == [b"abcd"]
+
+
+def test_reader_thread_frames_survive_buffer_reuse(port):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.02)
+    # A small buffer, so make_room moves to a fresh one several times
+    uart.RX_BUF_SIZE = uart.READ_CHUNK
+    uart.rx = bytearray(uart.RX_BUF_SIZE)
+    uart.rx_view = memoryview(uart.rx)
+    uart.start_reader()
+    sent = [bytes([i]) * 100 for i in range(1, 11)]
+    try:
+        for data in sent:
+            os.write(master, data)
+            time.sleep(0.06)
+        frames = wait_frames(uart, len(sent))
+    finally:
+        uart.stop_reader()
+        uart.ser.close()
+    # Frames are views into the receive buffer: earlier ones must not be overwritten
+    assert [bytes(f) for f, now, delta in frames] == sent
+
+
+def test_stop_reader_returns_while_idle(port):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.02)
+    uart.start_reader()
+    start = time.monotonic()
+    uart.stop_reader()
+    uart.ser.close()
+    assert uart.reader is None
+    assert time.monotonic() - start < 1.0
+
+
+def test_kernel_gap_returns_one_frame_per_burst(port):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.1)
+    uart.start_reader(kernel_gap=True)
+    try:
+        assert uart.vtime == 1
+        os.write(master, b"\x10\x11\x12")
+        time.sleep(0.3)
+        os.write(master, bytes(range(256)) * 2)  # more than VMIN: several reads, one frame
+        frames = wait_frames(uart, 2)
+    finally:
+        uart.stop_reader()
+        uart.ser.close()
+    assert [bytes(f) for f, now, delta in frames] == [b"\x10\x11\x12", bytes(range(256)) * 2]
+
+
+def test_kernel_gap_restores_tty_settings(port):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.1)
+    before = termios.tcgetattr(uart.ser.fd)
+    uart.start_reader(kernel_gap=True)
+    uart.stop_reader()
+    assert termios.tcgetattr(uart.ser.fd) == before
+    assert not os.get_blocking(uart.ser.fd)
+    uart.ser.close()
+
+
+def test_kernel_gap_below_vtime_resolution_uses_reader_thread(port, capsys):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.02)
+    uart.start_reader(kernel_gap=True)
+    try:
+        assert uart.saved_termios is None
+        os.write(master, b"\x20\x21")
+        frames = wait_frames(uart, 1)
+    finally:
+        uart.stop_reader()
+        uart.ser.close()
+    assert "below the 0.1 s VTIME resolution" in capsys.readouterr().out
+    assert [bytes(f) for f, now, delta in frames] == [b"\x20\x21"]
+
+
+def test_init_kernel_gap_rejects_short_gaps(port):
+    master, name = port
+    uart = HardUart(name, 38400, gap_sec=0.05)
+    try:
+        with pytest.raises(ValueError):
+            uart.init_kernel_gap()
+        assert uart.saved_termios is None
+    finally:
+        uart.ser.close()
+
+
+def test_init_kernel_gap_needs_a_tty():
+    uart = HardUart(None, 38400, gap_sec=0.1)
+    uart.ser = object()  # no fd, like a non-POSIX port
+    with pytest.raises(ValueError):
+        uart.init_kernel_gap()
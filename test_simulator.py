@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from bench_decode import encode_8e2
+from gpio_uart import GpioUart
+from simulator import BitBangReader, load_test
+
+BIT_US = 1000000 / 38400
+
+
+def bit_bang(durations):
+    """Words a BitBangReader returns for a [(level, duration_us)] waveform."""
+    reader = BitBangReader(38400, GpioUart.BB_BITS)
+    t = 0
+    for level, duration in durations:
+        reader.edge(t, level)
+        t += duration
+    reader.flush(t + 20 * BIT_US)
+    return [int.from_bytes(reader.data[i:i + 2], 'little') for i in range(0, len(reader.data), 2)]
+
+
+def test_bit_bang_reader_reads_stop_bits_as_data():
+    words = [0x14D, 0x1C0, 0x000, 0x0FF, 0x1FF]
+    durations = encode_8e2(words, jitter_us=2, rng=random.Random(3))
+    assert bit_bang(durations) == [w | GpioUart.BB_STOP for w in words]
+
+
+def test_bit_bang_reader_stop_bit_low_fails_framing():
+    # Start bit, 9 data bits of 1, then the line stays low through both stop bits
+    durations = [(1, 100), (0, BIT_US), (1, 9 * BIT_US), (0, 3 * BIT_US), (1, 100)]
+    word = bit_bang(durations)[0]
+    assert word & 0x1FF == 0x1FF
+    assert word & GpioUart.BB_STOP != GpioUart.BB_STOP
+
+
+@pytest.mark.parametrize("engine, gpio_mode", [
+    ("poll", "notify"),
+    ("poll", "callback"),
+    ("poll", "bb_serial"),
+    ("asyncio", "notify"),
+])
+def test_load_test_delivers_every_burst_and_frame(engine, gpio_mode):
+    stats = load_test(10, 10, 1.0, engine=engine, gpio_mode=gpio_mode)
+    assert stats["gpio_bursts_sent"] > 0
+    assert stats["gpio_frames_decoded"] == stats["gpio_bursts_sent"]
+    assert stats["framing_errors"] == 0
+    assert stats["bb_framing_errors"] == 0
+    assert stats["edges_dropped"] == 0
+    if gpio_mode != "bb_serial":
+        assert stats["edges_received"] == stats["edges_sent"]
+    assert stats["uart_frames_sent"] > 0
+    assert stats["uart_frames_received"] == stats["uart_frames_sent"]